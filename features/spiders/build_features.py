@@ -1,9 +1,46 @@
 # features/spiders/build_features.py
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Columns consumed from raw spider parquets (anything else is not read)
+SPIDER_COLS = ["date", "open", "high", "low", "close", "volume", "members_used"]
+
+# Threads reading spider parquets in build_all_spider_features
+READ_WORKERS = 8
+
+
+def _read_spider_parquet(path: Path) -> pd.DataFrame:
+    present = set(pq.read_schema(path).names)
+    cols = [c for c in SPIDER_COLS if c in present]
+    return pd.read_parquet(path, columns=cols, engine="pyarrow")
+
+
+# Low-cardinality columns worth dictionary-encoding; float features are near-unique
+DICT_COLS = ["spider_id", "members_used", "vol_surge"]
+
+
+def _write_features_parquet(df: pd.DataFrame, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if "spider_id" in df.columns and not isinstance(df["spider_id"].dtype, pd.CategoricalDtype):
+        df = df.assign(spider_id=df["spider_id"].astype("category"))
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="snappy",
+        use_dictionary=[c for c in DICT_COLS if c in df.columns],
+        write_statistics=True,
+        row_group_size=128_000,
+        data_page_size=1 << 20,
+    )
 
 
 def _ensure_cols(df: pd.DataFrame, required: list[str]) -> None:
@@ -12,6 +49,36 @@ def _ensure_cols(df: pd.DataFrame, required: list[str]) -> None:
         raise KeyError(f"Missing required columns: {missing}")
 
 
+def _normalize_date(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse and sort the date column only when needed. Parquet dates already come
+    back as datetime64 and 07B writes spiders sorted, so usually this is a no-op.
+    """
+    col = df["date"]
+    if not pd.api.types.is_datetime64_dtype(col.dtype):
+        df["date"] = pd.to_datetime(col, errors="raise", cache=True)
+    if not df["date"].is_monotonic_increasing:
+        df = df.sort_values("date", kind="stable")
+    return df
+
+
+def _prepare_spider_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Date-indexed, date-sorted OHLCV frame (volume defaults to 0)."""
+    # Normalize date column
+    if "date" in df.columns:
+        df = _normalize_date(df).set_index("date")
+    else:
+        # If index is date-like, keep but validate
+        if not isinstance(df.index, pd.DatetimeIndex):
+            raise KeyError("Spider parquet must contain 'date' column or DatetimeIndex.")
+        df = df.sort_index()
+
+    _ensure_cols(df, ["open", "high", "low", "close"])
+    if "volume" not in df.columns:
+        df["volume"] = 0.0  # optional; keep consistent
+    return df
+
+
 def build_spider_features(
     *,
     spider_parquet: Path,
@@ -30,22 +97,7 @@ def build_spider_features(
     if not spider_parquet.exists():
         raise FileNotFoundError(f"Missing spider parquet: {spider_parquet}")
 
-    df = pd.read_parquet(spider_parquet)
-
-    # Normalize date column
-    if "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"])
-        df = df.sort_values("date").reset_index(drop=True)
-        df = df.set_index("date")
-    else:
-        # If index is date-like, keep but validate
-        if not isinstance(df.index, pd.DatetimeIndex):
-            raise KeyError("Spider parquet must contain 'date' column or DatetimeIndex.")
-        df = df.sort_index()
-
-    _ensure_cols(df, ["open", "high", "low", "close"])
-    if "volume" not in df.columns:
-        df["volume"] = 0.0  # optional; keep consistent
+    df = _prepare_spider_frame(_read_spider_parquet(spider_parquet))
 
     # Apply canonical indicator pipeline
     try:
@@ -56,13 +108,65 @@ def build_spider_features(
             "Ensure features/technicals/pipeline.py defines apply_indicators()."
         ) from e
 
-    out = apply_indicators(df.copy(), indicators_cfg)
+    out = apply_indicators(df, indicators_cfg)
 
     # Optional trim (research/backtest window later). Keep None for now.
     if trim_last_n_days is not None and trim_last_n_days > 0:
         out = out.tail(int(trim_last_n_days)).copy()
 
-    out_parquet.parent.mkdir(parents=True, exist_ok=True)
-    out.reset_index().to_parquet(out_parquet, index=False)
+    out = out.reset_index()
+    _write_features_parquet(out, out_parquet)
+
+    return out
+
+
+def build_all_spider_features(
+    *,
+    spiders_dir: Path,
+    out_dir: Path,
+    indicators_cfg: Dict[str, Any],
+    spider_ids: Optional[List[str]] = None,
+    trim_last_n_days: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Batch variant of build_spider_features: every spider is read up front,
+    stacked into one long frame and run through a single grouped indicator
+    kernel call (spiders in parallel), then written to out_dir/{spider_id}.parquet
+    exactly as the per-spider builder would.
+
+    Returns the long feature frame with a leading categorical spider_id column.
+    """
+    from features.technicals.pipeline import apply_indicators_batch
+
+    if spider_ids is None:
+        spider_ids = [p.stem for p in sorted(spiders_dir.glob("SECTOR_*.parquet"))]
+
+    srcs = [spiders_dir / f"{spider_id}.parquet" for spider_id in spider_ids]
+    for src in srcs:
+        if not src.exists():
+            raise FileNotFoundError(f"Missing spider parquet: {src}")
+
+    if not srcs:
+        return pd.DataFrame()
+
+    # Parquet decode releases the GIL, so the reads overlap on a few threads
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, len(srcs))) as pool:
+        frames = list(pool.map(lambda src: _prepare_spider_frame(_read_spider_parquet(src)), srcs))
+
+    lengths = [len(f) for f in frames]
+    big = apply_indicators_batch(pd.concat(frames), lengths, indicators_cfg).reset_index()
+
+    ends = np.cumsum(lengths)
+    parts = []
+    for spider_id, a, b in zip(spider_ids, ends - lengths, ends):
+        out = big.iloc[a:b]
+        if trim_last_n_days is not None and trim_last_n_days > 0:
+            out = out.tail(int(trim_last_n_days))
+        out = out.reset_index(drop=True)
+        _write_features_parquet(out, out_dir / f"{spider_id}.parquet")
+        parts.append(out)
 
-    return out.reset_index()
+    long = pd.concat(parts, ignore_index=True)
+    long.insert(0, "spider_id", pd.Categorical.from_codes(
+        np.repeat(np.arange(len(spider_ids)), [len(x) for x in parts]), categories=spider_ids))
+    return long
@@ -0,0 +1,444 @@
+# features/technicals/_kernels.py
+"""
+Numba kernels behind the technical indicators.
+
+Every kernel takes contiguous float64 ndarrays and returns ndarrays; the pandas
+wrappers in features.technicals.indicators handle index alignment. Kernels are
+nogil, so independent series can be processed from a thread pool.
+
+If numba is not installed the kernels still run as plain Python (slow, but
+numerically identical).
+
+Custom per-window reductions that have no running-sum/deque form should go
+through sliding_reduce (a zero-copy window view plus one numpy reduce), not
+pandas rolling(...).apply(f, raw=True). E.g. a linear-regression slope:
+
+    idx = np.arange(n) - (n - 1) / 2.0
+    slope = sliding_reduce(x, n, lambda w, axis: (w * idx).sum(axis) / (idx * idx).sum())
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+from pathlib import Path
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - numba is optional at runtime
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def wrap(fn):
+            return fn
+
+        return wrap
+
+
+def to_f64(values) -> np.ndarray:
+    """Contiguous float64 view (or copy, if needed) of a Series/array."""
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+
+
+def sliding_reduce(x: np.ndarray, window: int, op) -> np.ndarray:
+    """
+    out[i] = op(x[i - window + 1 : i + 1]) for every full window, NaN during warmup.
+
+    op is called once as op(windows, axis=1) on a (n - window + 1, window) view,
+    so it must be a vectorized reduce (np.mean, np.median, np.ptp, ...). NaNs
+    propagate however op handles them.
+    """
+    out = np.full(x.shape[0], np.nan)
+    if window < 1 or x.shape[0] < window:
+        return out
+    out[window - 1:] = op(np.lib.stride_tricks.sliding_window_view(x, window), axis=1)
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _ewm_update(weighted, old_wt, cur, alpha):
+    """
+    One adjust=False EWM step with pandas semantics; returns (weighted, old_wt).
+
+    NaN inputs carry the previous value forward and decay its weight across the gap.
+    """
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if cur == cur:
+            if weighted != cur:
+                weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+            old_wt = 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+@njit(cache=True, nogil=True)
+def _ewm_alpha(x, alpha, min_periods):
+    """
+    Exponentially weighted mean, adjust=False.
+
+    Mirrors pandas ewm(alpha=..., adjust=False, min_periods=...).mean().
+    """
+    n = x.shape[0]
+    out = np.empty(n, dtype=np.float64)
+    minp = max(min_periods, 1)
+
+    weighted = np.nan
+    old_wt = 1.0
+    nobs = 0
+    for i in range(n):
+        cur = x[i]
+        if cur == cur:
+            nobs += 1
+        weighted, old_wt = _ewm_update(weighted, old_wt, cur, alpha)
+        out[i] = weighted if nobs >= minp else np.nan
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _macd(x, fast, slow, signal):
+    """
+    MACD line, signal line and histogram in one pass over x.
+
+    Same values as ema(x, fast) - ema(x, slow) followed by ema(line, signal),
+    each with min_periods equal to its span.
+    """
+    n = x.shape[0]
+    mline = np.empty(n, dtype=np.float64)
+    sline = np.empty(n, dtype=np.float64)
+    hist = np.empty(n, dtype=np.float64)
+
+    af = 2.0 / (fast + 1.0)
+    aslow = 2.0 / (slow + 1.0)
+    asig = 2.0 / (signal + 1.0)
+
+    ef = np.nan
+    es = np.nan
+    esig = np.nan
+    wf = 1.0
+    ws = 1.0
+    wsig = 1.0
+    nobs = 0
+    nsig = 0
+    for i in range(n):
+        cur = x[i]
+        if cur == cur:
+            nobs += 1
+        ef, wf = _ewm_update(ef, wf, cur, af)
+        es, ws = _ewm_update(es, ws, cur, aslow)
+
+        f = ef if nobs >= max(fast, 1) else np.nan
+        s = es if nobs >= max(slow, 1) else np.nan
+        m = f - s
+        if m == m:
+            nsig += 1
+        esig, wsig = _ewm_update(esig, wsig, m, asig)
+        sig = esig if nsig >= max(signal, 1) else np.nan
+
+        mline[i] = m
+        sline[i] = sig
+        hist[i] = m - sig
+
+    return mline, sline, hist
+
+
+@njit(cache=True, nogil=True)
+def _rsi(x, period, min_periods):
+    """RSI with EWM(alpha=1/period) smoothing; NaN where the average loss is zero."""
+    n = x.shape[0]
+    gain = np.empty(n, dtype=np.float64)
+    loss = np.empty(n, dtype=np.float64)
+    if n > 0:
+        gain[0] = np.nan
+        loss[0] = np.nan
+    for i in range(1, n):
+        d = x[i] - x[i - 1]
+        if d != d:
+            gain[i] = np.nan
+            loss[i] = np.nan
+        else:
+            gain[i] = d if d > 0.0 else 0.0
+            loss[i] = -d if d < 0.0 else 0.0
+
+    avg_gain = _ewm_alpha(gain, 1.0 / period, min_periods)
+    avg_loss = _ewm_alpha(loss, 1.0 / period, min_periods)
+
+    out = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        al = avg_loss[i]
+        if al != 0.0:
+            out[i] = 100.0 - (100.0 / (1.0 + avg_gain[i] / al))
+        else:
+            out[i] = np.nan
+    return out
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _ewm_stack(x, alphas, min_periods, out):
+    """
+    Fill out[:, j] with _ewm_alpha(x, alphas[j], min_periods[j]).
+
+    Each column is an independent recurrence, so spans run in parallel.
+    """
+    for j in prange(alphas.shape[0]):
+        out[:, j] = _ewm_alpha(x, alphas[j], min_periods[j])
+
+
+@njit(cache=True, nogil=True)
+def _ewm_stack_serial(x, alphas, min_periods, out):
+    """
+    _ewm_stack without prange, for callers already running on worker threads
+    (the default workqueue threading layer does not support concurrent launches).
+    """
+    for j in range(alphas.shape[0]):
+        out[:, j] = _ewm_alpha(x, alphas[j], min_periods[j])
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean(x, window):
+    """
+    Rolling mean via a Kahan-compensated running sum (O(1) per bar).
+    Windows holding fewer than `window` non-NaN values emit NaN.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+
+    nobs = 0
+    sum_x = 0.0
+    comp = 0.0
+    for i in range(n):
+        val = x[i]
+        if val == val:
+            nobs += 1
+            y = val - comp
+            t = sum_x + y
+            comp = (t - sum_x) - y
+            sum_x = t
+
+        if i >= window:
+            old = x[i - window]
+            if old == old:
+                nobs -= 1
+                y = -old - comp
+                t = sum_x + y
+                comp = (t - sum_x) - y
+                sum_x = t
+
+        if nobs >= window:
+            out[i] = sum_x / nobs
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean_std(x, window):
+    """
+    Rolling mean and population std (ddof=0) in a single pass.
+
+    Welford add/remove updates keep each step O(1). Windows holding fewer than
+    `window` non-NaN values emit NaN (pandas min_periods=window).
+    """
+    n = x.shape[0]
+    mean = np.full(n, np.nan)
+    sd = np.full(n, np.nan)
+
+    nobs = 0
+    mean_x = 0.0
+    ssqdm = 0.0
+    for i in range(n):
+        val = x[i]
+        if val == val:
+            nobs += 1
+            delta = val - mean_x
+            mean_x += delta / nobs
+            ssqdm += delta * (val - mean_x)
+
+        if i >= window:
+            old = x[i - window]
+            if old == old:
+                nobs -= 1
+                if nobs > 0:
+                    delta = old - mean_x
+                    mean_x -= delta / nobs
+                    ssqdm -= delta * (old - mean_x)
+                else:
+                    mean_x = 0.0
+                    ssqdm = 0.0
+
+        if nobs >= window:
+            var = ssqdm / nobs
+            mean[i] = mean_x
+            sd[i] = np.sqrt(var) if var > 0.0 else 0.0
+
+    return mean, sd
+
+
+@njit(cache=True, nogil=True)
+def _rolling_extreme_deque(x, window, is_max):
+    """
+    Rolling max (is_max=True) or min over `window` bars in O(n).
+
+    A monotonic deque of candidate indices lives in a fixed ring buffer; NaNs
+    are never pushed and windows with fewer than `window` values emit NaN.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    dq = np.empty(window, dtype=np.int64)
+    head = 0
+    size = 0
+    nobs = 0
+
+    for i in range(n):
+        # Expire the index leaving the window before pushing, so the ring
+        # never holds more than `window` entries.
+        if i >= window:
+            old = x[i - window]
+            if old == old:
+                nobs -= 1
+            if size > 0 and dq[head] == i - window:
+                head = (head + 1) % window
+                size -= 1
+
+        val = x[i]
+        if val == val:
+            nobs += 1
+            while size > 0:
+                tail = dq[(head + size - 1) % window]
+                if (x[tail] <= val) if is_max else (x[tail] >= val):
+                    size -= 1
+                else:
+                    break
+            dq[(head + size) % window] = i
+            size += 1
+
+        if nobs >= window:
+            out[i] = x[dq[head]]
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_max_deque(x, window):
+    return _rolling_extreme_deque(x, window, True)
+
+
+@njit(cache=True, nogil=True)
+def _rolling_min_deque(x, window):
+    return _rolling_extreme_deque(x, window, False)
+
+
+@njit(cache=True, nogil=True)
+def _feature_block(close, high, low, vol, spans, bb_window, bb_n_std, donch_window,
+                   vol_window, compute_macd, macd_fast, macd_slow, macd_signal,
+                   compute_rsi, rsi_period, out):
+    """
+    Write the apply_indicators float feature columns for one series into out,
+    in pipeline column order: EMAs, BB mid/upper/lower, Donchian high/low/mid,
+    volume SMA, [MACD line/signal/hist], [RSI].
+    """
+    j = 0
+    for k in range(spans.shape[0]):
+        out[:, j] = _ewm_alpha(close, 2.0 / (spans[k] + 1.0), spans[k])
+        j += 1
+
+    mid, sd = _rolling_mean_std(close, bb_window)
+    out[:, j] = mid
+    out[:, j + 1] = mid + bb_n_std * sd
+    out[:, j + 2] = mid - bb_n_std * sd
+    j += 3
+
+    d_high = _rolling_max_deque(high, donch_window)
+    d_low = _rolling_min_deque(low, donch_window)
+    out[:, j] = d_high
+    out[:, j + 1] = d_low
+    out[:, j + 2] = (d_high + d_low) / 2.0
+    j += 3
+
+    out[:, j] = _rolling_mean(vol, vol_window)
+    j += 1
+
+    if compute_macd:
+        mline, sline, hist = _macd(close, macd_fast, macd_slow, macd_signal)
+        out[:, j] = mline
+        out[:, j + 1] = sline
+        out[:, j + 2] = hist
+        j += 3
+
+    if compute_rsi:
+        out[:, j] = _rsi(close, rsi_period, rsi_period)
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _feature_block_grouped(close, high, low, vol, starts, ends, spans, bb_window, bb_n_std,
+                           donch_window, vol_window, compute_macd, macd_fast, macd_slow,
+                           macd_signal, compute_rsi, rsi_period, out):
+    """_feature_block over each [starts[g], ends[g]) slice of a long frame, groups in parallel."""
+    for g in prange(starts.shape[0]):
+        a = starts[g]
+        b = ends[g]
+        _feature_block(close[a:b], high[a:b], low[a:b], vol[a:b], spans, bb_window, bb_n_std,
+                       donch_window, vol_window, compute_macd, macd_fast, macd_slow,
+                       macd_signal, compute_rsi, rsi_period, out[a:b])
+
+
+# -----------------------------------------------------------------------------
+# Python-level entry points
+# -----------------------------------------------------------------------------
+# Prefer the AOT build (python -m features.technicals._kernels_build) so fresh
+# processes skip JIT warmup; otherwise use the @njit kernels above. Kernels call
+# each other through the underscored names, never through these.
+#
+# pycc exports cannot release the GIL, so off the main thread (07C's spider
+# thread pool) the entry points dispatch to the nogil @njit kernels instead,
+# same as indicators.ema_stack does for the parallel kernel.
+#
+# The build records a hash of this file next to the extension; a build from an
+# older _kernels.py is ignored rather than run alongside the edited JIT kernels.
+AOT_STAMP = Path(__file__).with_name("_kernels_aot.sha256")
+
+
+def source_sha256() -> str:
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+def _load_aot():
+    try:
+        if AOT_STAMP.read_text(encoding="utf-8").strip() != source_sha256():
+            return None
+        from features.technicals import _kernels_aot  # type: ignore
+    except (OSError, ImportError):
+        return None
+    return _kernels_aot
+
+
+_aot = _load_aot()
+
+
+def _entry(name: str, jit_fn):
+    if _aot is None:
+        return jit_fn
+    aot_fn = getattr(_aot, name)
+
+    def call(*args):
+        if threading.current_thread() is threading.main_thread():
+            return aot_fn(*args)
+        return jit_fn(*args)
+
+    call.__name__ = name
+    call.__doc__ = jit_fn.__doc__
+    return call
+
+
+ewm_alpha = _entry("ewm_alpha", _ewm_alpha)
+rolling_mean = _entry("rolling_mean", _rolling_mean)
+rolling_mean_std = _entry("rolling_mean_std", _rolling_mean_std)
+rolling_max = _entry("rolling_max", _rolling_max_deque)
+rolling_min = _entry("rolling_min", _rolling_min_deque)
+macd_lines = _entry("macd_lines", _macd)
+rsi_line = _entry("rsi_line", _rsi)
@@ -0,0 +1,66 @@
+# features/technicals/_kernels_build.py
+"""
+AOT-compile the serial indicator kernels into features/technicals/_kernels_aot*.so
+
+    python -m features.technicals._kernels_build
+
+_kernels.py picks the extension up automatically; without it the @njit kernels
+are compiled on first use (and cached on disk). The build stamps the source hash
+of _kernels.py into _kernels_aot.sha256, and a stale build is skipped until it
+is rebuilt.
+The parallel kernels (_ewm_stack, _feature_block_grouped) stay JIT-only.
+"""
+from __future__ import annotations
+
+from pathlib import Path
+
+from numba.pycc import CC
+
+from features.technicals._kernels import (
+    AOT_STAMP, _ewm_alpha, _macd, _rolling_max_deque, _rolling_mean, _rolling_mean_std,
+    _rolling_min_deque, _rsi, source_sha256,
+)
+
+cc = CC("_kernels_aot")
+cc.output_dir = str(Path(__file__).resolve().parent)
+
+
+@cc.export("ewm_alpha", "f8[:](f8[::1], f8, i8)")
+def ewm_alpha(x, alpha, min_periods):
+    return _ewm_alpha(x, alpha, min_periods)
+
+
+@cc.export("rolling_mean", "f8[:](f8[::1], i8)")
+def rolling_mean(x, window):
+    return _rolling_mean(x, window)
+
+
+@cc.export("rolling_mean_std", "UniTuple(f8[:], 2)(f8[::1], i8)")
+def rolling_mean_std(x, window):
+    return _rolling_mean_std(x, window)
+
+
+@cc.export("rolling_max", "f8[:](f8[::1], i8)")
+def rolling_max(x, window):
+    return _rolling_max_deque(x, window)
+
+
+@cc.export("rolling_min", "f8[:](f8[::1], i8)")
+def rolling_min(x, window):
+    return _rolling_min_deque(x, window)
+
+
+@cc.export("macd_lines", "UniTuple(f8[:], 3)(f8[::1], i8, i8, i8)")
+def macd_lines(x, fast, slow, signal):
+    return _macd(x, fast, slow, signal)
+
+
+@cc.export("rsi_line", "f8[:](f8[::1], i8, i8)")
+def rsi_line(x, period, min_periods):
+    return _rsi(x, period, min_periods)
+
+
+if __name__ == "__main__":
+    cc.compile()
+    AOT_STAMP.write_text(source_sha256() + "\n", encoding="utf-8")
+    print(f"[OK] built {cc.output_dir}/{cc.name}")
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import pandas as pd
 
+from features.technicals.indicators import bollinger_bands
+
 
 def compute_bollinger(close: pd.Series, period: int, stdev: float = 2.0) -> pd.DataFrame:
     """
@@ -10,14 +12,6 @@ def compute_bollinger(close: pd.Series, period: int, stdev: float = 2.0) -> pd.D
       mid = SMA(period)
       upper/lower = mid +/- stdev * rolling_std(period)
     """
-    close = close.astype(float)
-
-    mid = close.rolling(period, min_periods=period).mean()
-    sd = close.rolling(period, min_periods=period).std(ddof=0)
-
-    out = pd.DataFrame(index=close.index)
-    out["bb_mid"] = mid
-    out["bb_upper"] = mid + stdev * sd
-    out["bb_lower"] = mid - stdev * sd
+    out = bollinger_bands(close, window=period, n_std=stdev)
     out["bb_width"] = (out["bb_upper"] - out["bb_lower"]) / out["bb_mid"]
     return out
@@ -3,6 +3,8 @@ from __future__ import annotations
 
 import pandas as pd
 
+from features.technicals.indicators import donchian_channels
+
 
 def compute_donchian(high: pd.Series, low: pd.Series, lookback: int) -> pd.DataFrame:
     """
@@ -12,10 +14,8 @@ def compute_donchian(high: pd.Series, low: pd.Series, lookback: int) -> pd.DataF
       - donchian_high
       - donchian_low
     """
-    high = high.astype(float)
-    low = low.astype(float)
-
-    out = pd.DataFrame(index=high.index)
-    out["donchian_high"] = high.rolling(lookback, min_periods=lookback).max()
-    out["donchian_low"] = low.rolling(lookback, min_periods=lookback).min()
-    return out
+    dc = donchian_channels(high, low, window=lookback)
+    return pd.DataFrame(
+        {"donchian_high": dc["donch_high"], "donchian_low": dc["donch_low"]},
+        index=high.index,
+    )
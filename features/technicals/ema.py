@@ -3,10 +3,12 @@ from __future__ import annotations
 
 import pandas as pd
 
+from features.technicals.indicators import ema
+
 
 def compute_ema(close: pd.Series, span: int) -> pd.Series:
     """
-    Exponential moving average using pandas ewm.
+    Exponential moving average (adjust=False recurrence, no warmup mask).
 
     Args:
         close: price series
@@ -15,5 +17,4 @@ def compute_ema(close: pd.Series, span: int) -> pd.Series:
     Returns:
         EMA series (same index)
     """
-    close = close.astype(float)
-    return close.ewm(span=span, adjust=False).mean()
+    return ema(close, span, min_periods=0)
@@ -1,52 +1,146 @@
 # features/technicals/indicators.py
 from __future__ import annotations
 
+import threading
+from contextlib import contextmanager
+from typing import Callable, Hashable, Iterator, Optional, Sequence
+
 import numpy as np
 import pandas as pd
 
+from features.technicals._kernels import (
+    _ewm_stack, _ewm_stack_serial, ewm_alpha, macd_lines, rolling_max, rolling_mean,
+    rolling_mean_std, rolling_min, rsi_line, to_f64,
+)
+
+
+# Per-thread memo of kernel outputs, only active inside indicator_cache().
+# Keys use the input buffer address + length; each entry pins its input array
+# so the address cannot be recycled while the entry is alive.
+_CACHE = threading.local()
+
+
+@contextmanager
+def indicator_cache() -> Iterator[None]:
+    """
+    Reuse EMA/SMA/std results computed on the same array within the block
+    (e.g. MACD's fast/slow EMAs when they also appear in ema_spans).
+    """
+    prev = getattr(_CACHE, "store", None)
+    _CACHE.store = {}
+    try:
+        yield
+    finally:
+        _CACHE.store = prev
+
+
+def _memo_key(arr: np.ndarray, key: Hashable) -> tuple:
+    return arr.__array_interface__["data"][0], arr.shape[0], key
+
+
+def _memo(arr: np.ndarray, key: Hashable, fn: Callable[[], object]):
+    store = getattr(_CACHE, "store", None)
+    if store is None:
+        return fn()
+    k = _memo_key(arr, key)
+    hit = store.get(k)
+    if hit is None:
+        hit = (arr, fn())
+        store[k] = hit
+    return hit[1]
+
+
+def _memo_peek(arr: np.ndarray, key: Hashable):
+    store = getattr(_CACHE, "store", None)
+    hit = store.get(_memo_key(arr, key)) if store is not None else None
+    return None if hit is None else hit[1]
+
 
-def ema(series: pd.Series, span: int) -> pd.Series:
-    return series.ewm(span=span, adjust=False, min_periods=span).mean()
+def _ema_arr(x: np.ndarray, span: int, min_periods: Optional[int] = None) -> np.ndarray:
+    minp = span if min_periods is None else min_periods
+    key = ("ema", span) if minp == span else ("ema", span, minp)
+    return _memo(x, key, lambda: ewm_alpha(x, 2.0 / (span + 1.0), minp))
+
+
+def _mean_std_arr(x: np.ndarray, window: int):
+    return _memo(x, ("mean_std", window), lambda: rolling_mean_std(x, window))
+
+
+def ema(series: pd.Series, span: int, min_periods: Optional[int] = None) -> pd.Series:
+    """EMA, adjust=False; NaN for the first `min_periods` bars (default: span)."""
+    return pd.Series(_ema_arr(to_f64(series), span, min_periods), index=series.index)
+
+
+def ema_stack(series: pd.Series, spans: Sequence[int], alphas: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    EMAs for several spans in one parallel kernel call -> (len(series), len(spans)).
+    Same values as ema(series, span) per column; results also seed the memo.
+    alphas (2 / (span + 1), float64) may be passed in when already precomputed.
+    """
+    x = to_f64(series)
+    spans_arr = np.asarray(spans, dtype=np.int64)
+    if alphas is None:
+        alphas = 2.0 / (spans_arr + 1.0)
+    out = np.empty((x.shape[0], spans_arr.shape[0]), dtype=np.float64)
+    # prange only from the main thread; pool workers already run spiders in parallel
+    on_main = threading.current_thread() is threading.main_thread()
+    (_ewm_stack if on_main else _ewm_stack_serial)(x, alphas, spans_arr, out)
+    for j, span in enumerate(spans_arr):
+        _memo(x, ("ema", int(span)), lambda col=out[:, j]: col)
+    return out
+
+
+def _sma_arr(x: np.ndarray, window: int) -> np.ndarray:
+    return _memo(x, ("mean", window), lambda: rolling_mean(x, window))
 
 
 def sma(series: pd.Series, window: int) -> pd.Series:
-    return series.rolling(window=window, min_periods=window).mean()
+    return pd.Series(_sma_arr(to_f64(series), window), index=series.index)
 
 
 def rolling_std(series: pd.Series, window: int) -> pd.Series:
-    return series.rolling(window=window, min_periods=window).std(ddof=0)
+    return pd.Series(_mean_std_arr(to_f64(series), window)[1], index=series.index)
 
 
 def bollinger_bands(close: pd.Series, window: int = 20, n_std: float = 2.0) -> pd.DataFrame:
-    mid = sma(close, window)
-    sd = rolling_std(close, window)
+    mid, sd = _mean_std_arr(to_f64(close), window)
     upper = mid + n_std * sd
     lower = mid - n_std * sd
-    return pd.DataFrame({"bb_mid": mid, "bb_upper": upper, "bb_lower": lower})
+    return pd.DataFrame({"bb_mid": mid, "bb_upper": upper, "bb_lower": lower}, index=close.index)
 
 
 def donchian_channels(high: pd.Series, low: pd.Series, window: int = 20) -> pd.DataFrame:
-    d_high = high.rolling(window=window, min_periods=window).max()
-    d_low = low.rolling(window=window, min_periods=window).min()
+    d_high = rolling_max(to_f64(high), window)
+    d_low = rolling_min(to_f64(low), window)
     d_mid = (d_high + d_low) / 2.0
-    return pd.DataFrame({"donch_high": d_high, "donch_low": d_low, "donch_mid": d_mid})
+    return pd.DataFrame({"donch_high": d_high, "donch_low": d_low, "donch_mid": d_mid}, index=high.index)
 
 
 def macd(close: pd.Series, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
-    macd_line = ema(close, fast) - ema(close, slow)
-    signal_line = ema(macd_line, signal)
-    hist = macd_line - signal_line
-    return pd.DataFrame({"macd": macd_line, "macd_signal": signal_line, "macd_hist": hist})
-
-
-def rsi(close: pd.Series, period: int = 14) -> pd.Series:
-    delta = close.diff()
-    gain = delta.clip(lower=0.0)
-    loss = (-delta).clip(lower=0.0)
-
-    avg_gain = gain.ewm(alpha=1/period, adjust=False, min_periods=period).mean()
-    avg_loss = loss.ewm(alpha=1/period, adjust=False, min_periods=period).mean()
-
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    out = 100.0 - (100.0 / (1.0 + rs))
-    return out.rename("rsi")
+    x = to_f64(close)
+    ema_fast = _memo_peek(x, ("ema", fast))
+    ema_slow = _memo_peek(x, ("ema", slow))
+    if ema_fast is not None and ema_slow is not None:
+        # Both EMAs already computed (e.g. in ema_spans): only the signal pass is left
+        macd_line = ema_fast - ema_slow
+        signal_line = ewm_alpha(macd_line, 2.0 / (signal + 1.0), signal)
+        hist = macd_line - signal_line
+    else:
+        macd_line, signal_line, hist = macd_lines(x, fast, slow, signal)
+    return pd.DataFrame(
+        {"macd": macd_line, "macd_signal": signal_line, "macd_hist": hist},
+        index=close.index,
+    )
+
+
+def rsi(close: pd.Series, period: int = 14, min_periods: Optional[int] = None) -> pd.Series:
+    minp = period if min_periods is None else min_periods
+    return pd.Series(rsi_line(to_f64(close), period, minp), index=close.index, name="rsi")
+
+
+def relative_volume(volume: pd.Series, window: int) -> pd.Series:
+    """volume / SMA(volume, window); NaN until the SMA is defined and wherever it is zero."""
+    v = to_f64(volume)
+    vavg = _sma_arr(v, window)
+    out = np.divide(v, vavg, out=np.full_like(v, np.nan), where=vavg > 0)
+    return pd.Series(out, index=volume.index, name="rel_vol")
@@ -1,23 +1,13 @@
 # Path: features/technicals/momentum.py
 from __future__ import annotations
 
-import numpy as np
 import pandas as pd
 
+from features.technicals.indicators import rsi
+
 
 def compute_rsi(close: pd.Series, period: int = 14) -> pd.Series:
     """
     RSI (Wilder-style smoothing approximation using ewm).
     """
-    close = close.astype(float)
-    delta = close.diff()
-
-    gain = delta.clip(lower=0.0)
-    loss = (-delta).clip(lower=0.0)
-
-    avg_gain = gain.ewm(alpha=1 / period, adjust=False).mean()
-    avg_loss = loss.ewm(alpha=1 / period, adjust=False).mean()
-
-    rs = avg_gain / avg_loss.replace(0, np.nan)
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return rsi(close, period, min_periods=0)
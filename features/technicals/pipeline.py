@@ -2,18 +2,20 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List
+from typing import Dict, List, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from features.technicals._kernels import _feature_block_grouped, to_f64
 from features.technicals.indicators import (
-    ema, bollinger_bands, donchian_channels, macd, rsi, sma
+    bollinger_bands, donchian_channels, ema_stack, indicator_cache, macd, rsi, sma
 )
 
 
 @dataclass(frozen=True)
 class IndicatorConfig:
-    ema_spans: List[int]
+    ema_spans: Tuple[int, ...]
     bb_window: int
     bb_n_std: float
     donch_window: int
@@ -26,55 +28,158 @@ class IndicatorConfig:
     compute_macd: bool = True
     compute_rsi: bool = True
 
+    def __post_init__(self):
+        # Normalize once: ints for windows, int64 spans + float64 alphas for the EMA kernel
+        object.__setattr__(self, "ema_spans", tuple(int(s) for s in self.ema_spans))
+        for name in ("bb_window", "donch_window", "vol_avg_window",
+                     "macd_fast", "macd_slow", "macd_signal", "rsi_period"):
+            object.__setattr__(self, name, int(getattr(self, name)))
+        spans = np.asarray(self.ema_spans, dtype=np.int64)
+        object.__setattr__(self, "_spans", spans)
+        object.__setattr__(self, "_alphas", 2.0 / (spans + 1.0))
+
+
+def _ema_params(cfg) -> Tuple[np.ndarray, np.ndarray]:
+    """(int64 spans, float64 alphas); precomputed on IndicatorConfig, built here for plain namespaces."""
+    spans = getattr(cfg, "_spans", None)
+    if spans is None:
+        spans = np.asarray(cfg.ema_spans, dtype=np.int64)
+        return spans, 2.0 / (spans + 1.0)
+    return spans, cfg._alphas
+
 
 def apply_indicators(df: pd.DataFrame, cfg: IndicatorConfig) -> pd.DataFrame:
     """
     Input df must have columns: date, open, high, low, close, volume
     Output: df + indicator columns (aligned, NaNs during warmup)
     """
-    out = df.copy()
+    with indicator_cache():
+        return _apply_indicators(df, cfg)
+
+
+_OHLCV_COLS = ("open", "high", "low", "close", "volume")
+
+
+def _ensure_float64(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast OHLCV columns to float64 only where they are not already."""
+    casts = {c: np.float64 for c in _OHLCV_COLS if c in df.columns and df[c].dtype != np.float64}
+    return df.astype(casts) if casts else df
+
+
+def _feature_names(cfg: IndicatorConfig) -> List[str]:
+    """Float feature columns in output order (vol_surge is uint8, inserted after vol_sma)."""
+    names = [f"ema{span}" for span in cfg.ema_spans]
+    names += [
+        f"bb_mid_{cfg.bb_window}",
+        f"bb_upper_{cfg.bb_window}_{int(cfg.bb_n_std)}",
+        f"bb_lower_{cfg.bb_window}_{int(cfg.bb_n_std)}",
+        f"donch_high_{cfg.donch_window}",
+        f"donch_low_{cfg.donch_window}",
+        f"donch_mid_{cfg.donch_window}",
+        f"vol_sma_{cfg.vol_avg_window}",
+    ]
+    if cfg.compute_macd:
+        names += ["macd", "macd_signal", "macd_hist"]
+    if cfg.compute_rsi:
+        names += ["rsi"]
+    return names
 
-    # Ensure sort
-    if "date" in out.columns:
-        out = out.sort_values("date").reset_index(drop=True)
 
-    close = out["close"].astype(float)
-    high = out["high"].astype(float)
-    low = out["low"].astype(float)
+def _with_features(df: pd.DataFrame, feat: np.ndarray, names: List[str], vol_surge: np.ndarray,
+                   cfg: IndicatorConfig) -> pd.DataFrame:
+    feat_df = pd.DataFrame(feat, columns=names, index=df.index, copy=False)
+    feat_df.insert(names.index(f"vol_sma_{cfg.vol_avg_window}") + 1, "vol_surge", vol_surge)
+    return pd.concat([df, feat_df], axis=1)
+
+
+def _apply_indicators(df: pd.DataFrame, cfg: IndicatorConfig) -> pd.DataFrame:
+    # No defensive copy: df is never mutated, indicators go into a new block.
+    # Ensure sort (no-op when already sorted)
+    if "date" in df.columns:
+        if not df["date"].is_monotonic_increasing:
+            df = df.sort_values("date")
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            df = df.reset_index(drop=True)
+
+    df = _ensure_float64(df)
+    close = df["close"]
+    high = df["high"]
+    low = df["low"]
+
+    # All float features land in one pre-sized float32 block -> single concat at the end
+    names = _feature_names(cfg)
+    slot = {name: j for j, name in enumerate(names)}
+    feat = np.empty((len(df), len(names)), dtype=np.float32)
+
+    def put(name: str, values) -> None:
+        feat[:, slot[name]] = values
 
     # EMA stack
-    for span in cfg.ema_spans:
-        out[f"ema{span}"] = ema(close, span)
+    spans, alphas = _ema_params(cfg)
+    emas = ema_stack(close, spans, alphas)
+    for j, span in enumerate(cfg.ema_spans):
+        put(f"ema{span}", emas[:, j])
 
     # Bollinger
     bb = bollinger_bands(close, window=cfg.bb_window, n_std=cfg.bb_n_std)
-    bb = bb.rename(columns={
-        "bb_mid": f"bb_mid_{cfg.bb_window}",
-        "bb_upper": f"bb_upper_{cfg.bb_window}_{int(cfg.bb_n_std)}",
-        "bb_lower": f"bb_lower_{cfg.bb_window}_{int(cfg.bb_n_std)}",
-    })
-    out = pd.concat([out, bb], axis=1)
+    put(f"bb_mid_{cfg.bb_window}", bb["bb_mid"])
+    put(f"bb_upper_{cfg.bb_window}_{int(cfg.bb_n_std)}", bb["bb_upper"])
+    put(f"bb_lower_{cfg.bb_window}_{int(cfg.bb_n_std)}", bb["bb_lower"])
 
     # Donchian
     dc = donchian_channels(high, low, window=cfg.donch_window)
-    dc = dc.rename(columns={
-        "donch_high": f"donch_high_{cfg.donch_window}",
-        "donch_low": f"donch_low_{cfg.donch_window}",
-        "donch_mid": f"donch_mid_{cfg.donch_window}",
-    })
-    out = pd.concat([out, dc], axis=1)
+    put(f"donch_high_{cfg.donch_window}", dc["donch_high"])
+    put(f"donch_low_{cfg.donch_window}", dc["donch_low"])
+    put(f"donch_mid_{cfg.donch_window}", dc["donch_mid"])
 
     # Volume avg + surge flag
-    vol = out["volume"].astype(float).fillna(0.0)
-    out[f"vol_sma_{cfg.vol_avg_window}"] = sma(vol, cfg.vol_avg_window)
-    out["vol_surge"] = vol > (out[f"vol_sma_{cfg.vol_avg_window}"] * cfg.vol_surge_mult)
+    vol = df["volume"].fillna(0.0) if df["volume"].hasnans else df["volume"]
+    vol_sma = sma(vol, cfg.vol_avg_window).to_numpy()
+    put(f"vol_sma_{cfg.vol_avg_window}", vol_sma)
+    # NaN warmup compares False; stored as 0/1 uint8
+    vol_surge = np.greater(vol.to_numpy(), vol_sma * cfg.vol_surge_mult).view(np.uint8)
 
     # Optional momentum overlays (compute now, used later if desired)
     if cfg.compute_macd:
         m = macd(close, fast=cfg.macd_fast, slow=cfg.macd_slow, signal=cfg.macd_signal)
-        out = pd.concat([out, m], axis=1)
+        put("macd", m["macd"])
+        put("macd_signal", m["macd_signal"])
+        put("macd_hist", m["macd_hist"])
 
     if cfg.compute_rsi:
-        out["rsi"] = rsi(close, period=cfg.rsi_period)
+        put("rsi", rsi(close, period=cfg.rsi_period))
 
-    return out
+    return _with_features(df, feat, names, vol_surge, cfg)
+
+
+def apply_indicators_batch(df: pd.DataFrame, lengths: Sequence[int], cfg: IndicatorConfig) -> pd.DataFrame:
+    """
+    apply_indicators over many series stacked end-to-end (e.g. all spiders).
+
+    df holds consecutive groups of `lengths[g]` rows, each already sorted by date;
+    indicators never cross group boundaries. All groups are computed in one
+    parallel kernel call. Output matches apply_indicators per group.
+    """
+    ends = np.cumsum(np.asarray(lengths, dtype=np.int64))
+    starts = ends - np.asarray(lengths, dtype=np.int64)
+    if len(ends) and ends[-1] != len(df):
+        raise ValueError(f"lengths sum to {ends[-1]} but df has {len(df)} rows")
+
+    df = _ensure_float64(df)
+    close = to_f64(df["close"])
+    vol = to_f64(df["volume"].fillna(0.0) if df["volume"].hasnans else df["volume"])
+
+    names = _feature_names(cfg)
+    feat = np.empty((len(df), len(names)), dtype=np.float64)
+    _feature_block_grouped(
+        close, to_f64(df["high"]), to_f64(df["low"]), vol, starts, ends,
+        _ema_params(cfg)[0],
+        int(cfg.bb_window), float(cfg.bb_n_std), int(cfg.donch_window), int(cfg.vol_avg_window),
+        bool(cfg.compute_macd), int(cfg.macd_fast), int(cfg.macd_slow), int(cfg.macd_signal),
+        bool(cfg.compute_rsi), int(cfg.rsi_period),
+        feat,
+    )
+
+    vol_sma = feat[:, names.index(f"vol_sma_{cfg.vol_avg_window}")]
+    vol_surge = np.greater(vol, vol_sma * cfg.vol_surge_mult).view(np.uint8)
+    return _with_features(df, feat.astype(np.float32), names, vol_surge, cfg)
@@ -3,11 +3,12 @@ from __future__ import annotations
 
 import pandas as pd
 
+from features.technicals.indicators import relative_volume
+
 
 def compute_relative_volume(volume: pd.Series, period: int) -> pd.Series:
     """
     Relative volume = volume / SMA(volume, period)
+    NaN until the SMA is defined and wherever it is zero.
     """
-    volume = volume.astype(float)
-    vavg = volume.rolling(period, min_periods=period).mean()
-    return volume / vavg
+    return relative_volume(volume, period)
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Dict, Optional, Tuple, Any
 
+import numpy as np
 import pandas as pd
 import yaml
 
@@ -210,6 +211,50 @@ def spider_risk_multiplier(stage: Optional[int], cfg: SpiderGateConfig) -> float
     return float(rm.get(str(int(stage)), rm.get("default", 1.0)))
 
 
+def spider_gate_table(stages_df: pd.DataFrame, cfg: SpiderGateConfig) -> pd.DataFrame:
+    """
+    Vectorized spider_gate_decision + spider_risk_multiplier for every stored row.
+
+    stages_df: SpiderStageStore.load().reset_index() (spider_id, date, stage, ...).
+    Returns it sorted by (spider_id, date) with allowed / reason / risk_mult added;
+    values match calling spider_gate_decision on each (spider_id, date).
+    """
+    df = stages_df.sort_values(["spider_id", "date"], kind="mergesort").reset_index(drop=True)
+    stage = df["stage"].astype("int64")
+
+    if not cfg.enabled:
+        allowed = pd.Series(True, index=df.index)
+        reason = pd.Series("gate_disabled", index=df.index, dtype=object)
+    else:
+        stage_ok = stage.isin(cfg.allow_stages) & ~stage.isin(cfg.block_stages)
+        allowed = stage_ok
+        reason = pd.Series(np.where(stage_ok, "stage_allowed", "stage_blocked"), index=df.index, dtype=object)
+
+        n = max(1, int(cfg.min_consecutive_days_in_allow))
+        if n > 1:
+            # Same rule as _consecutive_allow_ok: some run of n allowed rows must lie
+            # entirely inside the 10*n calendar days ending at `date`.
+            by_spider = df["spider_id"]
+            run_id = (~stage_ok).cumsum()
+            streak = stage_ok.astype("int64").groupby([by_spider, run_id]).cumsum()
+            run_start = df.groupby("spider_id")["date"].shift(n - 1).where(streak >= n)
+            run_start = run_start.groupby(by_spider).ffill()
+            consec_ok = run_start >= df["date"] - pd.Timedelta(days=10 * n - 1)
+
+            allowed = stage_ok & consec_ok
+            reason = reason.mask(stage_ok & ~consec_ok, "not_enough_consecutive_allow_days")
+
+    rm = cfg.stage_risk_multiplier or {}
+    default_rm = float(rm.get("default", 1.0))
+    risk_mult = stage.astype(str).map(rm).astype("float64").fillna(default_rm)
+
+    df["stage"] = stage
+    df["allowed"] = allowed.astype(bool)
+    df["reason"] = reason
+    df["risk_mult"] = risk_mult
+    return df
+
+
 # Convenience one-liner for later engine use
 def is_spider_allowed(root: Path, spider_id: str, date: pd.Timestamp) -> bool:
     cfg = load_spider_gate_config(root)
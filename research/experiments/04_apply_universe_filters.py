@@ -1,19 +1,23 @@
 # Path: research/experiments/04_apply_universe_filters.py
 from __future__ import annotations
 
-import json
-import re
+import sys
+from collections import defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict
 
+import numpy as np
 import pandas as pd
 
-
 # =============================================================================
 # CONFIG (zero-arg runnable)
 # =============================================================================
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from research.pipeline_io import dumps_json, latest_file
 
 IN_DIR = ROOT / "data" / "cleaned" / "universe"
 OUT_DIR = ROOT / "data" / "cleaned" / "universe"
@@ -51,60 +55,56 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+def read_csv_arrow(path: Path) -> pd.DataFrame:
+    """
+    Multithreaded Arrow CSV parse with Arrow-backed columns; default C engine if
+    pyarrow is missing.
+    """
+    try:
+        return pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow")
+    except ImportError:
+        return pd.read_csv(path)
+
+
 def latest_contract_file() -> Path:
-    files = sorted(IN_DIR.glob("universe_finviz_contract_*.csv"))
-    if not files:
+    path = latest_file(IN_DIR, "universe_finviz_contract_*.csv")
+    if path is None:
         raise FileNotFoundError("No contract universe file found. Run script 03 first.")
-    return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)[0]
+    return path
+
 
 
 # =============================================================================
 # Market cap parsing & formatting
 # =============================================================================
-def parse_market_cap_usd(x: str) -> float:
+# Suffix -> multiplier; no suffix means the plain Finviz number (MILLIONS)
+_CAP_MULT = {"": 1e6, "T": 1e12, "B": 1e9, "M": 1e6, "K": 1e3}
+
+
+def parse_market_cap_usd_series(col: pd.Series) -> pd.Series:
     """
-    Finviz export:
+    Finviz market cap column -> USD (one regex pass):
     - Plain numbers are in MILLIONS
-    - Supports M / B / T / K suffixes if present
+    - Supports M / B / T / K suffixes if present; anything else is NaN
     """
-    if x is None:
-        return float("nan")
+    s = col.astype("string").str.strip().str.upper()
+    ext = s.str.extract(r"^([\d.]+)\s*([TBMK]?)$")
+    num = pd.to_numeric(ext[0], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    mult = ext[1].map(_CAP_MULT).to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.Series(num * mult, index=col.index)
 
-    s = str(x).strip()
-    if s in ("", "-", "nan"):
-        return float("nan")
 
-    if re.fullmatch(r"[\d\.]+", s):
-        return float(s) * 1e6  # assume MILLIONS
-
-    m = re.match(r"^([\d\.]+)\s*([TtBbMmKk])$", s)
-    if not m:
-        return float("nan")
-
-    val = float(m.group(1))
-    suf = m.group(2).upper()
-    mult = {"T": 1e12, "B": 1e9, "M": 1e6, "K": 1e3}[suf]
-    return val * mult
-
-
-def fmt_market_cap(usd: float) -> str:
+def fmt_market_cap_series(col: pd.Series) -> pd.Series:
     """
-    Pretty formatting:
-    - 1.2345T
-    - 38.2937B
-    - 287.5400M
+    USD -> 1.2345T / 38.2937B / 287.5400M / 1.0000K (NaN -> ""); scale/suffix
+    picked with np.select, then one format pass.
     """
-    if usd != usd:
-        return ""
-    if usd >= 1e12:
-        return f"{usd/1e12:.4f}T"
-    if usd >= 1e9:
-        return f"{usd/1e9:.4f}B"
-    if usd >= 1e6:
-        return f"{usd/1e6:.4f}M"
-    if usd >= 1e3:
-        return f"{usd/1e3:.4f}K"
-    return f"{usd:.4f}"
+    u = col.to_numpy(dtype=np.float64, na_value=np.nan)
+    conds = [u >= 1e12, u >= 1e9, u >= 1e6, u >= 1e3]
+    div = np.select(conds, [1e12, 1e9, 1e6, 1e3], default=1.0)
+    suf = np.select(conds, ["T", "B", "M", "K"], default="")
+    out = ["" if v != v else f"{v:.4f}{x}" for v, x in zip((u / div).tolist(), suf.tolist())]
+    return pd.Series(out, index=col.index, dtype=object)
 
 
 # =============================================================================
@@ -113,10 +113,50 @@ def fmt_market_cap(usd: float) -> str:
 def load_exclusion_rules() -> List[Dict]:
     if not EXCLUSION_RULES_PATH.exists():
         return []
-    df = pd.read_csv(EXCLUSION_RULES_PATH)
+    df = read_csv_arrow(EXCLUSION_RULES_PATH)
     return df.to_dict("records")
 
 
+# Handlers take every value collected for their bucket and return the rows to exclude
+def _h_sector(df: pd.DataFrame, values: List[str]) -> pd.Series:
+    return df["sector"].isin(values)
+
+
+def _h_industry(df: pd.DataFrame, values: List[str]) -> pd.Series:
+    return df["industry"].isin(values)
+
+
+def _h_industry_contains(df: pd.DataFrame, patterns: List[str]) -> pd.Series:
+    # Patterns stay regexes (as before); one alternation = one pass
+    combined = "|".join(f"(?:{p})" for p in patterns)
+    col = df["industry"]
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        # Match the (few) categories once, then look rows up by code; code -1 (NaN) -> False
+        cats = col.cat.categories
+        hit = np.asarray(cats.str.contains(combined, case=False, regex=True), dtype=bool) if len(cats) else np.zeros(0, bool)
+        hit = np.append(hit, False)
+        return pd.Series(hit[col.cat.codes.to_numpy()], index=df.index)
+    return col.str.contains(combined, case=False, na=False, regex=True)
+
+
+def _h_ticker(df: pd.DataFrame, values: List[str]) -> pd.Series:
+    return df["ticker"].isin(values)
+
+
+def _split_list(pattern: str) -> List[str]:
+    return [x.strip() for x in pattern.split(",")]
+
+
+# rule_type -> (handler, pattern -> values); rule types sharing a handler share one pass
+EXCLUSION_RULES = {
+    "sector_equals": (_h_sector, lambda p: [p]),
+    "sector_in": (_h_sector, _split_list),
+    "industry_equals": (_h_industry, lambda p: [p]),
+    "industry_contains": (_h_industry_contains, lambda p: [p]),
+    "ticker_in": (_h_ticker, lambda p: [t.upper() for t in _split_list(p)]),
+}
+
+
 def apply_exclusions(df: pd.DataFrame) -> pd.DataFrame:
     if not EXCLUSIONS_ENABLED:
         return df
@@ -125,28 +165,17 @@ def apply_exclusions(df: pd.DataFrame) -> pd.DataFrame:
     if not rules:
         return df
 
-    keep = pd.Series(True, index=df.index)
-
+    buckets = defaultdict(list)
     for r in rules:
-        rule = r["rule_type"]
-        pattern = str(r["pattern"]).strip()
-
-        if rule == "sector_equals":
-            keep &= df["sector"] != pattern
-
-        elif rule == "sector_in":
-            sectors = [s.strip() for s in pattern.split(",")]
-            keep &= ~df["sector"].isin(sectors)
-
-        elif rule == "industry_equals":
-            keep &= df["industry"] != pattern
+        spec = EXCLUSION_RULES.get(r["rule_type"])
+        if spec is None:
+            continue
+        handler, expand = spec
+        buckets[handler].extend(expand(str(r["pattern"]).strip()))
 
-        elif rule == "industry_contains":
-            keep &= ~df["industry"].str.contains(pattern, case=False, na=False)
-
-        elif rule == "ticker_in":
-            tickers = [t.strip().upper() for t in pattern.split(",")]
-            keep &= ~df["ticker"].isin(tickers)
+    keep = pd.Series(True, index=df.index)
+    for handler, values in buckets.items():
+        keep &= ~handler(df, values)
 
     return df.loc[keep].copy()
 
@@ -161,16 +190,23 @@ def main() -> None:
     print("\n=== Apply Universe Filters (Trade-Ready) ===")
     print(f"[IN]  {in_path}")
 
-    df = pd.read_csv(in_path)
+    df = read_csv_arrow(in_path)
+
+    # Low-cardinality filter columns -> categorical: ==/isin compare int codes
+    for c in ("country", "sector", "industry"):
+        if c in df.columns:
+            df[c] = df[c].astype("category")
 
     # Market cap handling
-    df["market_cap_usd"] = df["market_cap"].apply(parse_market_cap_usd)
-    df["market_cap_fmt"] = df["market_cap_usd"].apply(fmt_market_cap)
+    df["market_cap_usd"] = parse_market_cap_usd_series(df["market_cap"])
+    df["market_cap_fmt"] = fmt_market_cap_series(df["market_cap_usd"])
 
     # Core filters
     before = len(df)
-    df = df[df["country"] == COUNTRY_KEEP]
-    df = df[df["market_cap_usd"] >= MIN_MARKET_CAP_USD]
+    # eq().to_numpy(na_value=False): Arrow-backed columns carry NA, not NaN
+    country_ok = df["country"].eq(COUNTRY_KEEP).to_numpy(dtype=bool, na_value=False)
+    mask = country_ok & (df["market_cap_usd"].to_numpy() >= MIN_MARKET_CAP_USD)
+    df = df.loc[mask]
 
     # Optional exclusions
     df = apply_exclusions(df)
@@ -182,17 +218,25 @@ def main() -> None:
         "market_cap_usd", "market_cap_fmt",
         "pe_num", "price_num", "change_pct", "volume_num"
     ]
-    trade_df = df[[c for c in cols if c in df.columns]].copy()
-    trade_df.drop(columns=[c for c in DROP_COLS if c in trade_df.columns], inplace=True, errors="ignore")
+    keep_cols = [c for c in cols if c in df.columns and c not in DROP_COLS]
+    trade_df = df.loc[:, keep_cols].copy()
 
     out_path = OUT_DIR / f"universe_trade_ready_{ts}.csv"
     trade_df.to_csv(out_path, index=False)
 
+    # Binary copy for pipeline readers (CSV stays for external tooling);
+    # market_cap_fmt is display-only and derivable from market_cap_usd
+    out_parquet = out_path.with_suffix(".parquet")
+    trade_df.drop(columns=["market_cap_fmt"], errors="ignore").to_parquet(
+        out_parquet, index=False, compression="snappy"
+    )
+
     # Report
     report = {
         "asof_utc": utc_now_iso(),
         "input": str(in_path),
         "output": str(out_path),
+        "output_parquet": str(out_parquet),
         "rows_before": int(before),
         "rows_after": int(after),
         "filters": {
@@ -205,9 +249,10 @@ def main() -> None:
     }
 
     rep_path = REPORT_DIR / f"universe_trade_ready_report_{ts}.json"
-    rep_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    rep_path.write_text(dumps_json(report, indent=True), encoding="utf-8")
 
     print(f"[OUT] {out_path}")
+    print(f"[OUT] {out_parquet}")
     print(f"[REP] {rep_path}")
     print(f"[INFO] rows {before} → {after}")
     print("\n[OK] Trade-ready universe generated.")
@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 from twelvedata import TDClient
 
@@ -36,39 +38,70 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+def write_ohlcv_parquet(df: pd.DataFrame, path: Path) -> None:
+    """
+    Daily OHLCV (~750 rows) -> zstd parquet. Dictionary encoding is off (dates
+    and prices are near-unique); statistics stay on so 06B can audit from footers.
+    """
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=False,
+        write_statistics=True,
+        row_group_size=1024,
+    )
+
+
+OHLCV_COLS = ["open", "high", "low", "close", "volume"]
+
+
+def _as_datetime(col: pd.Series) -> pd.Series:
+    # as_pandas() already yields datetime64; only strings/objects need parsing
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    # TwelveData strings are ISO ("2024-01-02[ 15:30:00]"): fixed-format C parser,
+    # cached over repeats; only if that loses values does the general parser run
+    out = pd.to_datetime(col, errors="coerce", utc=False, format="ISO8601", cache=True)
+    if out.isna().sum() > col.isna().sum():
+        out = pd.to_datetime(col, errors="coerce", utc=False)
+    return out
+
+
+def _as_numeric(df: pd.DataFrame, c: str) -> pd.Series:
+    if c not in df.columns:
+        return pd.Series(float("nan"), index=df.index)
+    col = df[c]
+    return col if pd.api.types.is_numeric_dtype(col) else pd.to_numeric(col, errors="coerce")
+
+
+def _finish_ohlcv(date: pd.Series, df: pd.DataFrame) -> pd.DataFrame:
+    """Assemble date + OHLCV (only these columns are materialized), drop NaT dates, sort ASC."""
+    out = pd.DataFrame({"date": date, **{c: _as_numeric(df, c) for c in OHLCV_COLS}})
+    if out["date"].hasnans:
+        out = out[out["date"].notna()]
+    if not out["date"].is_monotonic_increasing:
+        out = out.sort_values("date", kind="stable")
+    return out.reset_index(drop=True)
+
+
 def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
     """
     TwelveData pandas output typically includes a 'datetime' column or index.
     Standardize to:
       date (datetime64[ns]), open/high/low/close (float), volume (float)
-    Sorted ASC.
+    Sorted ASC. The input frame is never copied or modified.
     """
-    df = df.copy()
-
-    if "datetime" in df.columns:
-        df["date"] = pd.to_datetime(df["datetime"], errors="coerce", utc=False)
-        df = df.drop(columns=["datetime"])
-    else:
+    if "datetime" not in df.columns and "date" not in df.columns and df.index.name in ("datetime", "date"):
         # sometimes returned as index
-        if df.index.name in ("datetime", "date"):
-            df = df.reset_index()
-            if "datetime" in df.columns:
-                df["date"] = pd.to_datetime(df["datetime"], errors="coerce", utc=False)
-                df = df.drop(columns=["datetime"])
-            elif "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=False)
-
-    # Ensure required cols exist
-    for c in ["open", "high", "low", "close", "volume"]:
-        if c not in df.columns:
-            df[c] = None
-
-    # Types
-    for c in ["open", "high", "low", "close", "volume"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
+        df = df.reset_index()
 
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-    return df[["date", "open", "high", "low", "close", "volume"]]
+    src = "datetime" if "datetime" in df.columns else "date"
+    if src not in df.columns:
+        raise KeyError(f"normalize_ohlcv: no datetime/date column found. cols={list(df.columns)}")
+    return _finish_ohlcv(_as_datetime(df[src]), df)
 
 
 def main() -> None:
@@ -99,7 +132,7 @@ def main() -> None:
     df2 = normalize_ohlcv(df)
 
     out_path = OUT_DIR / f"{TEST_TICKER}.parquet"
-    df2.to_parquet(out_path, index=False)
+    write_ohlcv_parquet(df2, out_path)
 
     meta = {
         "asof_utc": utc_now_iso(),
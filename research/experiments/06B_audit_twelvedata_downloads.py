@@ -2,19 +2,27 @@
 from __future__ import annotations
 
 import os
-import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 from dotenv import load_dotenv
 
-
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from research.pipeline_io import dumps_json, latest_file, parquet_date_stats
+
 load_dotenv(ROOT / ".env")
 
 EXPECTED_LAST_DATE = os.getenv("TD_EXPECTED_LAST_DATE", "2026-01-30").strip()
 MIN_ROWS_OK = int(os.getenv("TD_MIN_ROWS_OK", "700"))
+# Per-file stats are I/O-bound (footer reads release the GIL) -> oversubscribe cores
+AUDIT_WORKERS = int(os.getenv("TD_AUDIT_WORKERS", str((os.cpu_count() or 1) * 4)))
 
 UNIVERSE_DIR = ROOT / "data" / "cleaned" / "universe"
 PRICES_DIR = ROOT / "data" / "raw" / "prices_daily" / "twelvedata"
@@ -29,15 +37,57 @@ def utc_now_iso() -> str:
 
 
 def latest_trade_ready_universe() -> Path:
-    files = sorted(UNIVERSE_DIR.glob("universe_trade_ready_*.csv"))
-    if not files:
+    """Newest trade-ready universe; the Parquet copy wins over its CSV twin."""
+    latest = latest_file(UNIVERSE_DIR, "universe_trade_ready_*.csv")
+    if latest is None:
         raise FileNotFoundError("No universe_trade_ready_*.csv found.")
-    return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)[0]
+    pq_path = latest.with_suffix(".parquet")
+    return pq_path if pq_path.exists() else latest
+
+
+
+def audit_one(t: str, exp_dt: pd.Timestamp) -> Optional[dict]:
+    """Audit row for one ticker, or None if its parquet is missing."""
+    fp = PARQUETS_DIR / f"{t}.parquet"
+    if not fp.exists():
+        return None
+
+    try:
+        n, first_dt, last_dt = parquet_date_stats(fp)
+        first = first_dt.strftime("%Y-%m-%d") if n else None
+        last = last_dt.strftime("%Y-%m-%d") if n else None
+
+        ok = (n >= MIN_ROWS_OK) and (last_dt is not None) and (last_dt >= exp_dt)
+        status = "ok" if ok else "partial"
+
+        return {
+            "ticker": t,
+            "status": status,
+            "rows": n,
+            "first_date": first,
+            "last_date": last,
+            "expected_last_date": EXPECTED_LAST_DATE,
+            "file": str(fp),
+        }
+    except Exception as e:
+        return {
+            "ticker": t,
+            "status": "error",
+            "rows": None,
+            "first_date": None,
+            "last_date": None,
+            "expected_last_date": EXPECTED_LAST_DATE,
+            "file": str(fp),
+            "error": str(e),
+        }
 
 
 def main() -> None:
     uni_path = latest_trade_ready_universe()
-    uni = pd.read_csv(uni_path)
+    if uni_path.suffix == ".parquet":
+        uni = pd.read_parquet(uni_path, columns=["ticker"])
+    else:
+        uni = pd.read_csv(uni_path, usecols=["ticker"])
     tickers = sorted(uni["ticker"].astype(str).str.upper().str.strip().unique().tolist())
 
     exp_dt = pd.to_datetime(EXPECTED_LAST_DATE)
@@ -45,44 +95,13 @@ def main() -> None:
     rows = []
     missing = []
 
-    for t in tickers:
-        fp = PARQUETS_DIR / f"{t}.parquet"
-        if not fp.exists():
-            missing.append(t)
-            continue
-
-        try:
-            df = pd.read_parquet(fp, columns=["date"])
-            df["date"] = pd.to_datetime(df["date"], errors="coerce")
-            df = df.dropna(subset=["date"]).sort_values("date")
-            n = int(len(df))
-            first = df["date"].iloc[0].strftime("%Y-%m-%d") if n else None
-            last = df["date"].iloc[-1].strftime("%Y-%m-%d") if n else None
-            last_dt = df["date"].iloc[-1] if n else pd.NaT
-
-            ok = (n >= MIN_ROWS_OK) and (pd.notna(last_dt)) and (last_dt >= exp_dt)
-            status = "ok" if ok else "partial"
-
-            rows.append({
-                "ticker": t,
-                "status": status,
-                "rows": n,
-                "first_date": first,
-                "last_date": last,
-                "expected_last_date": EXPECTED_LAST_DATE,
-                "file": str(fp),
-            })
-        except Exception as e:
-            rows.append({
-                "ticker": t,
-                "status": "error",
-                "rows": None,
-                "first_date": None,
-                "last_date": None,
-                "expected_last_date": EXPECTED_LAST_DATE,
-                "file": str(fp),
-                "error": str(e),
-            })
+    # Footer-only reads, threaded across files; results come back in ticker order
+    with ThreadPoolExecutor(max_workers=max(1, AUDIT_WORKERS)) as pool:
+        for t, row in zip(tickers, pool.map(lambda t: audit_one(t, exp_dt), tickers)):
+            if row is None:
+                missing.append(t)
+            else:
+                rows.append(row)
 
     df_rep = pd.DataFrame(rows)
     ok_n = int((df_rep["status"] == "ok").sum()) if not df_rep.empty else 0
@@ -109,7 +128,7 @@ def main() -> None:
     out_partial_csv = REPORTS_DIR / f"twelvedata_partials_{stamp}.csv"
     out_missing_txt = REPORTS_DIR / f"twelvedata_missing_{stamp}.txt"
 
-    out_json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    out_json.write_text(dumps_json(report, indent=True), encoding="utf-8")
     df_rep.to_csv(out_csv, index=False)
 
     if not df_rep.empty:
@@ -120,7 +139,7 @@ def main() -> None:
     print("\n=== Twelve Data Download Audit ===")
     print(f"[UNI] {uni_path.name}")
     print(f"[DIR] {PARQUETS_DIR}")
-    print(f"[EXP] expected_last_date={EXPECTED_LAST_DATE}  min_rows_ok={MIN_ROWS_OK}")
+    print(f"[EXP] expected_last_date={EXPECTED_LAST_DATE}  min_rows_ok={MIN_ROWS_OK}  workers={AUDIT_WORKERS}")
     print(f"[TOT] tickers={len(tickers)} present={len(tickers)-len(missing)} missing={len(missing)}")
     print(f"[OK ] ok={ok_n} partial={partial_n} error={error_n}")
     print("\n=== Outputs ===")
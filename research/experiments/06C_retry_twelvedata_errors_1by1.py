@@ -2,21 +2,32 @@
 from __future__ import annotations
 
 import os
-import json
+import sys
 import time
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from twelvedata import TDClient
 
-
 # =============================================================================
 # CONFIG — EDIT THESE ONLY
 # =============================================================================
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from research.pipeline_io import dumps_json, loads_json, JsonlWriter
+
 load_dotenv(ROOT / ".env")
 
 # Where your TwelveData outputs already live
@@ -47,6 +58,10 @@ MIN_ROWS_OK = int(os.getenv("TD_MIN_ROWS_OK", "700"))
 # Throttle between calls (seconds). Keep small but non-zero.
 SLEEP_BETWEEN_CALLS = float(os.getenv("TD_RETRY_SLEEP_SEC", "0.25"))
 
+# Requests in flight (HTTP wait overlaps parquet/log writes) and the plan's per-minute credit budget
+FETCH_WORKERS = int(os.getenv("TD_RETRY_WORKERS", "4"))
+RATE_PER_MIN = float(os.getenv("TD_RATE_PER_MIN", "8"))
+
 
 # =============================================================================
 # Helpers
@@ -55,10 +70,49 @@ def utc_now_iso() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def append_jsonl(path: Path, obj: Dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj) + "\n")
+class TokenBucket:
+    """
+    Thread-safe limiter shared by all fetch workers: at most `rate_per_min`
+    requests per rolling minute (bursts up to that size), and at least
+    `min_interval` seconds between consecutive requests.
+    """
+
+    def __init__(self, rate_per_min: float, min_interval: float = 0.0):
+        self.capacity = max(1.0, rate_per_min)
+        self.rate = rate_per_min / 60.0
+        self.min_interval = min_interval
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.last_grant = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                wait = max((1.0 - self.tokens) / self.rate, self.last_grant + self.min_interval - now, 0.0)
+                if wait <= 0.0:
+                    self.tokens -= 1.0
+                    self.last_grant = now
+                    return
+            time.sleep(wait)
+
+
+def make_td_client(pool_size: int) -> TDClient:
+    """
+    TDClient whose keep-alive session pools enough connections for every
+    fetch worker (requests' default pool keeps 10 and drops the rest).
+    """
+    td = TDClient(apikey=API_KEY)
+    session = getattr(getattr(getattr(td, "ctx", None), "http_client", None), "session", None)
+    if session is not None:
+        size = max(pool_size, 1)
+        adapter = HTTPAdapter(pool_connections=size, pool_maxsize=size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+    return td
 
 
 def is_minute_credit_error(e: Exception) -> bool:
@@ -66,31 +120,60 @@ def is_minute_credit_error(e: Exception) -> bool:
     return ("run out of api credits for the current minute" in msg) or ("out of api credits" in msg)
 
 
+OHLCV_COLS = ["open", "high", "low", "close", "volume"]
+
+
+def _as_datetime(col: pd.Series) -> pd.Series:
+    # as_pandas() already yields datetime64; only strings/objects need parsing
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    # TwelveData strings are ISO ("2024-01-02[ 15:30:00]"): fixed-format C parser,
+    # cached over repeats; only if that loses values does the general parser run
+    out = pd.to_datetime(col, errors="coerce", utc=False, format="ISO8601", cache=True)
+    if out.isna().sum() > col.isna().sum():
+        out = pd.to_datetime(col, errors="coerce", utc=False)
+    return out
+
+
+def _as_numeric(df: pd.DataFrame, c: str) -> pd.Series:
+    if c not in df.columns:
+        return pd.Series(float("nan"), index=df.index)
+    col = df[c]
+    return col if pd.api.types.is_numeric_dtype(col) else pd.to_numeric(col, errors="coerce")
+
+
+def _finish_ohlcv(date: pd.Series, df: pd.DataFrame) -> pd.DataFrame:
+    """Assemble date + OHLCV (only these columns are materialized), drop NaT dates, sort ASC."""
+    out = pd.DataFrame({"date": date, **{c: _as_numeric(df, c) for c in OHLCV_COLS}})
+    if out["date"].hasnans:
+        out = out[out["date"].notna()]
+    if not out["date"].is_monotonic_increasing:
+        out = out.sort_values("date", kind="stable")
+    return out.reset_index(drop=True)
+
+
 def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
-    if "datetime" in df.columns:
-        df["date"] = pd.to_datetime(df["datetime"], errors="coerce", utc=False)
-        df = df.drop(columns=["datetime"])
-    elif "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=False)
-    else:
-        for candidate in ("time", "timestamp", "level_1", "index"):
-            if candidate in df.columns:
-                df["date"] = pd.to_datetime(df[candidate], errors="coerce", utc=False)
-                df = df.drop(columns=[candidate])
-                break
-
-    if "date" not in df.columns:
+    src = next((c for c in ("datetime", "date", "time", "timestamp", "level_1", "index") if c in df.columns), None)
+    if src is None:
         raise KeyError(f"normalize_ohlcv: no datetime/date column found. cols={list(df.columns)}")
+    return _finish_ohlcv(_as_datetime(df[src]), df)
 
-    for c in ["open", "high", "low", "close", "volume"]:
-        if c not in df.columns:
-            df[c] = None
-        df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-    return df[["date", "open", "high", "low", "close", "volume"]]
+def write_ohlcv_parquet(df: pd.DataFrame, path: Path) -> None:
+    """
+    Daily OHLCV (~750 rows) -> zstd parquet. Dictionary encoding is off (dates
+    and prices are near-unique); statistics stay on so 06B can audit from footers.
+    """
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=False,
+        write_statistics=True,
+        row_group_size=1024,
+    )
 
 
 def coverage_status(sub: pd.DataFrame) -> Tuple[bool, str, str, int, str]:
@@ -118,26 +201,30 @@ def read_done_set_from_progress() -> set:
     """Skip tickers already marked ok / ok_short_history in _progress.jsonl."""
     done = set()
     if PROGRESS_JSONL.exists():
-        for line in PROGRESS_JSONL.read_text(encoding="utf-8").splitlines():
-            try:
-                obj = json.loads(line)
-                if obj.get("status") in ("ok", "ok_short_history"):
-                    t = obj.get("ticker")
-                    if t:
-                        done.add(str(t).upper().strip())
-            except Exception:
-                continue
+        # Stream: the log grows across retry campaigns, never hold it whole
+        with PROGRESS_JSONL.open("r", encoding="utf-8", buffering=1 << 20) as f:
+            for line in f:
+                try:
+                    obj = loads_json(line)
+                    if obj.get("status") in ("ok", "ok_short_history"):
+                        t = obj.get("ticker")
+                        if t:
+                            done.add(str(t).upper().strip())
+                except Exception:
+                    continue
     return done
 
 
-def symbol_candidates(ticker: str) -> List[str]:
+@lru_cache(maxsize=None)
+def symbol_candidates(ticker: str) -> Tuple[str, ...]:
     """
     TwelveData often prefers dot-notation for class shares / units:
       BF-A -> BF.A
       BRK-B -> BRK.B
       ALUB-U -> ALUB.U
 
-    We try a few safe transforms.
+    We try a few safe transforms. Cached per ticker (the error path asks again),
+    so the result is an immutable tuple.
     """
     t = ticker.strip().upper()
     cands = [t]
@@ -161,7 +248,57 @@ def symbol_candidates(ticker: str) -> List[str]:
         if x and x not in seen:
             out.append(x)
             seen.add(x)
-    return out
+    return tuple(out)
+
+
+def fetch_ticker(td: TDClient, bucket: TokenBucket, ticker: str):
+    """
+    Worker: try each symbol candidate until one returns usable candles.
+    Returns (ticker, queried_symbol, normalized_df, None) or (ticker, None, None, last_exception).
+    """
+    last_exception = None
+    for sym_try in symbol_candidates(ticker):
+        try:
+            # ---- IMPORTANT: handle minute-credit errors by sleeping and retrying SAME symbol ----
+            while True:
+                bucket.acquire()
+                try:
+                    ts = td.time_series(
+                        symbol=sym_try,  # IMPORTANT: single symbol string
+                        interval=INTERVAL,
+                        start_date=START_DATE,
+                        end_date=END_DATE,
+                        outputsize=OUTPUTSIZE,
+                        timezone=TZ,
+                        order="asc",
+                    )
+                    raw = ts.as_pandas()
+                    break
+                except Exception as e_req:
+                    if is_minute_credit_error(e_req):
+                        # Budget misjudged (other clients, plan change): back off, same symbol
+                        print(f"  [RATE] minute credits hit; sleeping ~65s then retrying {ticker} (symbol={sym_try})")
+                        time.sleep(65)
+                        continue
+                    raise
+
+            if raw is None or len(raw) == 0:
+                raise RuntimeError("Empty response")
+
+            # single-symbol responses can be a normal index, handle both
+            sub = raw.reset_index(drop=False)
+            if "datetime" not in sub.columns and "date" not in sub.columns and len(sub.columns) > 0:
+                sub = sub.rename(columns={sub.columns[0]: "datetime"})
+
+            return ticker, sym_try, normalize_ohlcv(sub), None
+
+        except Exception as e:
+            last_exception = e
+            # If it was a minute-credit issue, we would have retried above,
+            # so anything here is a real symbol/candles failure -> try next candidate.
+            continue
+
+    return ticker, None, None, last_exception
 
 
 # =============================================================================
@@ -190,134 +327,108 @@ def main() -> None:
     print(f"[OUT] {OUT_DIR}")
     print(f"[CFG] interval={INTERVAL} window={START_DATE}→{END_DATE} tz={TZ} outputsize={OUTPUTSIZE}")
     print(f"[GATE] expected_last={EXPECTED_LAST_DATE} min_rows_ok={MIN_ROWS_OK}")
-    print(f"[SLEEP] {SLEEP_BETWEEN_CALLS}s between calls")
+    print(f"[SLEEP] {SLEEP_BETWEEN_CALLS}s between calls  rate={RATE_PER_MIN:g}/min  workers={FETCH_WORKERS}")
 
     if not remaining:
         print("\n[OK] Nothing to retry (0 remaining). Exiting.")
         return
 
-    td = TDClient(apikey=API_KEY)
+    td = make_td_client(FETCH_WORKERS)
+
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(RETRY_ERRORS_JSONL)
+    atexit.register(progress_log.close)
+    atexit.register(errors_log.close)
 
     ok_n = 0
     partial_n = 0
     err_n = 0
 
-    for k, ticker in enumerate(remaining, start=1):
-        print(f"[TRY] {k}/{len(remaining)} ticker={ticker}")
-
-        success = False
-        last_exception = None
-
-        for sym_try in symbol_candidates(ticker):
-            try:
-                # ---- IMPORTANT: handle minute-credit errors by sleeping and retrying SAME symbol ----
-                while True:
-                    try:
-                        ts = td.time_series(
-                            symbol=sym_try,  # IMPORTANT: single symbol string
-                            interval=INTERVAL,
-                            start_date=START_DATE,
-                            end_date=END_DATE,
-                            outputsize=OUTPUTSIZE,
-                            timezone=TZ,
-                            order="asc",
-                        )
-                        raw = ts.as_pandas()
-                        break
-                    except Exception as e_req:
-                        if is_minute_credit_error(e_req):
-                            print(
-                                f"  [RATE] minute credits hit; sleeping ~65s then retrying {ticker} (symbol={sym_try})")
-                            time.sleep(65)
-                            continue
-                        raise
-
-                if raw is None or len(raw) == 0:
-                    raise RuntimeError("Empty response")
-
-                # single-symbol responses can be a normal index, handle both
-                sub = raw.reset_index(drop=False)
-                if "datetime" not in sub.columns and "date" not in sub.columns and len(sub.columns) > 0:
-                    sub = sub.rename(columns={sub.columns[0]: "datetime"})
-
-                sub = normalize_ohlcv(sub)
-
-                out_path = PARQUETS_DIR / f"{ticker}.parquet"
-                PARQUETS_DIR.mkdir(parents=True, exist_ok=True)
-                sub.to_parquet(out_path, index=False)
-
-                ok, first_s, last_s, rows, ok_reason = coverage_status(sub)
-                status = ok_reason if ok else "partial"
-
-                append_jsonl(PROGRESS_JSONL, {
+    bucket = TokenBucket(RATE_PER_MIN, min_interval=SLEEP_BETWEEN_CALLS)
+    PARQUETS_DIR.mkdir(parents=True, exist_ok=True)
+    META_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Workers only do HTTP + normalize; parquet/meta/log writes stay on this thread
+    with ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS)) as ex:
+        futures = [ex.submit(fetch_ticker, td, bucket, t) for t in remaining]
+
+        for k, fut in enumerate(as_completed(futures), start=1):
+            ticker, sym_try, sub, last_exception = fut.result()
+            print(f"[TRY] {k}/{len(remaining)} ticker={ticker}")
+
+            if sub is not None:
+                try:
+                    out_path = PARQUETS_DIR / f"{ticker}.parquet"
+                    write_ohlcv_parquet(sub, out_path)
+
+                    ok, first_s, last_s, rows, ok_reason = coverage_status(sub)
+                    status = ok_reason if ok else "partial"
+
+                    meta_path = META_DIR / f"{ticker}.meta.json"
+                    meta_path.write_text(dumps_json({
+                        "asof_utc": utc_now_iso(),
+                        "provider": "twelvedata",
+                        "ticker": ticker,
+                        "queried_symbol": sym_try,
+                        "interval": INTERVAL,
+                        "start_date": START_DATE,
+                        "end_date": END_DATE,
+                        "timezone": TZ,
+                        "rows": rows,
+                        "first_date": first_s,
+                        "last_date": last_s,
+                        "expected_last_date": EXPECTED_LAST_DATE,
+                        "min_rows_ok": MIN_ROWS_OK,
+                        "status": status,
+                        "output": str(out_path),
+                    }, indent=True), encoding="utf-8")
+
+                    # Progress last: the next run skips whatever is logged here, so only
+                    # after the parquet and meta are both on disk
+                    progress_log.write({
+                        "asof_utc": utc_now_iso(),
+                        "status": status,
+                        "ticker": ticker,
+                        "queried_symbol": sym_try,
+                        "rows": rows,
+                        "first_date": first_s,
+                        "last_date": last_s,
+                        "expected_last_date": EXPECTED_LAST_DATE,
+                        "min_rows_ok": MIN_ROWS_OK,
+                        "start_date": START_DATE,
+                        "end_date": END_DATE,
+                        "interval": INTERVAL,
+                        "timezone": TZ,
+                        "source": "retry_from_errors_csv",
+                    })
+
+                    if status in ("ok", "ok_short_history"):
+                        ok_n += 1
+                    else:
+                        partial_n += 1
+
+                    print(f"  [OK] queried={sym_try} status={status} rows={rows} last={last_s}")
+                except Exception as e:
+                    # Write failed (disk, bad frame): record like a fetch failure
+                    sub, last_exception = None, e
+
+            if sub is None:
+                err_n += 1
+                errors_log.write({
                     "asof_utc": utc_now_iso(),
-                    "status": status,
+                    "status": "error",
                     "ticker": ticker,
-                    "queried_symbol": sym_try,
-                    "rows": rows,
-                    "first_date": first_s,
-                    "last_date": last_s,
-                    "expected_last_date": EXPECTED_LAST_DATE,
-                    "min_rows_ok": MIN_ROWS_OK,
-                    "start_date": START_DATE,
-                    "end_date": END_DATE,
-                    "interval": INTERVAL,
-                    "timezone": TZ,
+                    "error": str(last_exception) if last_exception else "unknown_error",
+                    "candidates": list(symbol_candidates(ticker)),
                     "source": "retry_from_errors_csv",
                 })
+                print(f"  [ERR] {ticker}: {last_exception}")
 
-                meta_path = META_DIR / f"{ticker}.meta.json"
-                META_DIR.mkdir(parents=True, exist_ok=True)
-                meta_path.write_text(json.dumps({
-                    "asof_utc": utc_now_iso(),
-                    "provider": "twelvedata",
-                    "ticker": ticker,
-                    "queried_symbol": sym_try,
-                    "interval": INTERVAL,
-                    "start_date": START_DATE,
-                    "end_date": END_DATE,
-                    "timezone": TZ,
-                    "rows": rows,
-                    "first_date": first_s,
-                    "last_date": last_s,
-                    "expected_last_date": EXPECTED_LAST_DATE,
-                    "min_rows_ok": MIN_ROWS_OK,
-                    "status": status,
-                    "output": str(out_path),
-                }, indent=2), encoding="utf-8")
-
-                if status in ("ok", "ok_short_history"):
-                    ok_n += 1
-                else:
-                    partial_n += 1
-
-                print(f"  [OK] queried={sym_try} status={status} rows={rows} last={last_s}")
-                success = True
-                break
-
-
-            except Exception as e:
-                last_exception = e
-                # If it was a minute-credit issue, we would have retried above,
-                # so anything here is a real symbol/candles failure -> try next candidate.
-                continue
-
-        if not success:
-            err_n += 1
-            append_jsonl(RETRY_ERRORS_JSONL, {
-                "asof_utc": utc_now_iso(),
-                "status": "error",
-                "ticker": ticker,
-                "error": str(last_exception) if last_exception else "unknown_error",
-                "candidates": symbol_candidates(ticker),
-                "source": "retry_from_errors_csv",
-            })
-            print(f"  [ERR] {ticker}: {last_exception}")
-
-        time.sleep(SLEEP_BETWEEN_CALLS)
-
-        if k % 25 == 0 or k == len(remaining):
-            print(f"[PROG] {k}/{len(remaining)} ok={ok_n} partial={partial_n} err={err_n}")
+            if k % 25 == 0 or k == len(remaining):
+                print(f"[PROG] {k}/{len(remaining)} ok={ok_n} partial={partial_n} err={err_n}")
+
+    progress_log.close()
+    errors_log.close()
 
     print("\n[DONE] Retry pass complete.")
     print(f"       ok={ok_n} partial={partial_n} err={err_n}")
@@ -2,21 +2,31 @@
 from __future__ import annotations
 
 import os
-import json
+import sys
+import atexit
+import hashlib
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import List, Dict, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 from dotenv import load_dotenv
 from twelvedata import TDClient
 
-
 # =============================================================================
 # CONFIG (zero-arg runnable)
 # =============================================================================
 ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from research.pipeline_io import dumps_json, loads_json, JsonlWriter, latest_file, parquet_date_stats
+
 load_dotenv(ROOT / ".env")
 
 API_KEY = os.getenv("TWELVEDATA_API_KEY", "").strip()
@@ -27,6 +37,10 @@ TZ = os.getenv("TD_TIMEZONE", "UTC").strip()
 
 CREDITS_PER_MIN = int(os.getenv("TD_CREDITS_PER_MIN", os.getenv("TD_REQUESTS_PER_MIN", "8")))
 BATCH_SIZE = int(os.getenv("TD_BATCH_SIZE", "8"))
+# Batch requests in flight; the credit budget still caps the call rate
+FETCH_WORKERS = int(os.getenv("TD_FETCH_WORKERS", "2"))
+# Per-symbol split/normalize/parquet writes of one batch response
+WRITE_WORKERS = int(os.getenv("TD_WRITE_WORKERS", "8"))
 OUTPUTSIZE = int(os.getenv("TD_OUTPUTSIZE", "5000"))
 
 SMOKE_N = int(os.getenv("TD_SMOKE_N", "0"))
@@ -48,6 +62,8 @@ META_DIR.mkdir(parents=True, exist_ok=True)
 
 PROGRESS_JSONL = OUT_DIR / "_progress.jsonl"
 ERRORS_JSONL = OUT_DIR / "_errors.jsonl"
+# Done-set cache: tickers + the _progress.jsonl byte offset they cover
+DONE_CACHE_JSON = OUT_DIR / "_progress.done.json"
 
 
 def utc_now_iso() -> str:
@@ -55,41 +71,125 @@ def utc_now_iso() -> str:
 
 
 def latest_trade_ready_universe() -> Path:
-    files = sorted(UNIVERSE_DIR.glob("universe_trade_ready_20260205*.csv"))
-    if not files:
+    """Pinned trade-ready universe; the Parquet copy wins over its CSV twin."""
+    latest = latest_file(UNIVERSE_DIR, "universe_trade_ready_20260205*.csv")
+    if latest is None:
         raise FileNotFoundError("No universe_trade_ready_20260205*.csv found. Run Stage 4 first.")
-    return sorted(files, key=lambda p: p.stat().st_mtime, reverse=True)[0]
+    pq_path = latest.with_suffix(".parquet")
+    return pq_path if pq_path.exists() else latest
 
 
-def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-
-    # ---- standardize time column into df["date"] ----
-    if "datetime" in df.columns:
-        df["date"] = pd.to_datetime(df["datetime"], errors="coerce", utc=False)
-        df = df.drop(columns=["datetime"])
-    elif "date" in df.columns:
-        df["date"] = pd.to_datetime(df["date"], errors="coerce", utc=False)
-    else:
-        # common names after reset_index() on MultiIndex frames
-        for candidate in ("time", "timestamp", "level_1", "index"):
-            if candidate in df.columns:
-                df["date"] = pd.to_datetime(df[candidate], errors="coerce", utc=False)
-                df = df.drop(columns=[candidate])
-                break
 
-    # If still no date, fail loudly with context (this is what was happening)
-    if "date" not in df.columns:
+OHLCV_COLS = ["open", "high", "low", "close", "volume"]
+
+
+def _as_datetime(col: pd.Series) -> pd.Series:
+    # Already-parsed datetime64 passes through; the JSON candles carry strings
+    if pd.api.types.is_datetime64_any_dtype(col):
+        return col
+    # TwelveData strings are ISO ("2024-01-02[ 15:30:00]"): fixed-format C parser,
+    # cached over repeats; only if that loses values does the general parser run
+    out = pd.to_datetime(col, errors="coerce", utc=False, format="ISO8601", cache=True)
+    if out.isna().sum() > col.isna().sum():
+        out = pd.to_datetime(col, errors="coerce", utc=False)
+    return out
+
+
+def _as_numeric(df: pd.DataFrame, c: str) -> pd.Series:
+    if c not in df.columns:
+        return pd.Series(float("nan"), index=df.index)
+    col = df[c]
+    if not pd.api.types.is_numeric_dtype(col):
+        col = pd.to_numeric(col, errors="coerce")
+    # JSON values are strings: to_numeric would make volume (or a whole-dollar
+    # price column) int64, but the stored schema is float64 throughout
+    return col.astype("float64")
+
+
+def _finish_ohlcv(date: pd.Series, df: pd.DataFrame) -> pd.DataFrame:
+    """Assemble date + OHLCV (only these columns are materialized), drop NaT dates, sort ASC."""
+    out = pd.DataFrame({"date": date, **{c: _as_numeric(df, c) for c in OHLCV_COLS}})
+    if out["date"].hasnans:
+        out = out[out["date"].notna()]
+    if not out["date"].is_monotonic_increasing:
+        out = out.sort_values("date", kind="stable")
+    return out.reset_index(drop=True)
+
+
+def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    src = next((c for c in ("datetime", "date", "time", "timestamp", "level_1", "index") if c in df.columns), None)
+    if src is None:
         raise KeyError(f"normalize_ohlcv: no datetime/date column found. cols={list(df.columns)}")
+    return _finish_ohlcv(_as_datetime(df[src]), df)
 
-    # ---- ensure numeric OHLCV ----
-    for c in ["open", "high", "low", "close", "volume"]:
-        if c not in df.columns:
-            df[c] = None
-        df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    df = df.dropna(subset=["date"]).sort_values("date").reset_index(drop=True)
-    return df[["date", "open", "high", "low", "close", "volume"]]
+def write_ohlcv_parquet(df: pd.DataFrame, path: Path) -> None:
+    """
+    Daily OHLCV (~1300 rows) -> zstd parquet, same settings as 05/06C.
+    Dictionary encoding is off (dates and prices are near-unique); statistics
+    stay on so 06B can audit from footers.
+    """
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=False,
+        write_statistics=True,
+        row_group_size=1 << 16,
+    )
+
+
+def split_batch_json(batch: List[str], data) -> Dict[str, object]:
+    """
+    Raw time_series JSON (ts.price_endpoint.as_json()) -> {symbol: candles DataFrame | Exception}.
+
+    Skips the client's as_pandas() MultiIndex build, and a bad symbol only
+    fails itself (as_pandas raises for the whole batch). Batch payloads are
+    {symbol: {status, values | message}}; single-symbol requests come back
+    unwrapped as the candle list. Not TimeSeries.as_json(): that reshapes
+    batches to {symbol: tuple} and silently drops the error symbols.
+    """
+    if isinstance(data, dict) and data.get("status") == "error":
+        raise RuntimeError(data.get("message", "API error"))
+    if len(batch) == 1 and isinstance(data, (list, tuple)):
+        data = {batch[0]: {"status": "ok", "values": data}}
+    if not isinstance(data, dict):
+        raise RuntimeError(f"Unexpected response type: {type(data).__name__}")
+
+    parts: Dict[str, object] = {}
+    for sym in batch:
+        d = data.get(sym)
+        if not isinstance(d, dict):
+            parts[sym] = KeyError(f"Symbol missing from batch response: {sym}")
+        elif d.get("status") == "error":
+            parts[sym] = RuntimeError(d.get("message", "API error"))
+        elif not d.get("values"):
+            parts[sym] = RuntimeError("Empty response")
+        else:
+            parts[sym] = pd.DataFrame.from_records(d["values"])
+    return parts
+
+
+def save_batch_symbol(part, sym: str):
+    """
+    Worker: one symbol's candles (or its error from split_batch_json) -> parquet.
+    Returns (out_path, coverage_status(sub)); logging stays with the caller.
+    """
+    if isinstance(part, Exception):
+        raise part
+    sub = part
+
+    # If neither datetime nor date exist, assume first col is time and rename it.
+    if "datetime" not in sub.columns and "date" not in sub.columns and len(sub.columns) > 0:
+        sub = sub.rename(columns={sub.columns[0]: "datetime"})
+
+    sub = normalize_ohlcv(sub)
+
+    out_path = PARQUETS_DIR / f"{sym}.parquet"
+    write_ohlcv_parquet(sub, out_path)
+    return out_path, coverage_status(sub)
 
 
 def coverage_status(sub: pd.DataFrame) -> Tuple[bool, str, str, int, str]:
@@ -124,53 +224,157 @@ def coverage_status(sub: pd.DataFrame) -> Tuple[bool, str, str, int, str]:
     return (False, first_s, last_s, rows, "partial")
 
 
+def _add_if_done(line: bytes, done: set) -> None:
+    try:
+        obj = loads_json(line)
+        if obj.get("status") in ("ok", "ok_short_history"):
+            t = obj.get("ticker")
+            if t:
+                done.add(str(t).upper().strip())
+    except Exception:
+        pass
+
+
+def footer_complete(t: str, exp_dt: pd.Timestamp) -> bool:
+    """
+    True if a parquet from an earlier run already reaches EXPECTED_LAST_DATE
+    (same rule as coverage_status), judged from footer statistics only.
+    """
+    fp = PARQUETS_DIR / f"{t}.parquet"
+    if not fp.exists():
+        return False
+    try:
+        n, _, last_dt = parquet_date_stats(fp)
+    except Exception:
+        return False  # unreadable -> fetch again
+    return n > 0 and last_dt is not None and last_dt >= exp_dt
+
+
 def read_done_set() -> set:
+    """
+    Tickers marked ok / ok_short_history in _progress.jsonl.
+
+    Only lines appended since the last run are parsed: DONE_CACHE_JSON keeps
+    the set and the byte offset it covers. The log stays the source of truth;
+    if it shrank or its first bytes changed, the cache is rebuilt from zero.
+    """
     done = set()
-    if PROGRESS_JSONL.exists():
-        for line in PROGRESS_JSONL.read_text(encoding="utf-8").splitlines():
-            try:
-                obj = json.loads(line)
-                if obj.get("status") in ("ok", "ok_short_history"):
-                    t = obj.get("ticker")
-                    if t:
-                        done.add(str(t).upper().strip())
-            except Exception:
-                continue
-    return done
+    if not PROGRESS_JSONL.exists():
+        return done
+
+    offset = 0
+    try:
+        cache = loads_json(DONE_CACHE_JSON.read_bytes())
+    except Exception:
+        cache = None
+
+    with PROGRESS_JSONL.open("rb", buffering=1 << 20) as f:
+        if cache and 0 < cache.get("offset", 0) <= PROGRESS_JSONL.stat().st_size:
+            head = f.read(min(cache["offset"], 4096))
+            if hashlib.sha1(head).hexdigest() == cache.get("head_sha1"):
+                done = set(cache.get("done", ()))
+                offset = cache["offset"]
+
+        f.seek(offset)
+        tail = b""
+        for line in f:
+            if not line.endswith(b"\n"):
+                tail = line  # unterminated (write in flight): not cached, re-read next run
+                break
+            _add_if_done(line, done)
+            offset += len(line)
+
+        f.seek(0)
+        head_sha1 = hashlib.sha1(f.read(min(offset, 4096))).hexdigest()
 
+    try:
+        tmp = DONE_CACHE_JSON.with_suffix(".tmp")
+        tmp.write_text(dumps_json({"offset": offset, "head_sha1": head_sha1, "done": sorted(done)}), encoding="utf-8")
+        os.replace(tmp, DONE_CACHE_JSON)
+    except OSError:
+        pass  # cache is an optimization only
 
-def append_jsonl(path: Path, obj: Dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj) + "\n")
+    if tail:
+        _add_if_done(tail, done)
+    return done
 
 
 def chunk(lst: List[str], n: int) -> List[List[str]]:
     return [lst[i:i+n] for i in range(0, len(lst), n)]
 
 
-def sleep_for_rate_limit(last_req_time: float, batch_credits: int) -> float:
+class CreditBucket:
     """
-    TwelveData minute limit is CREDIT-based.
-    Assume: 1 symbol ~= 1 credit for time_series batch.
-    We space calls so credits/min isn't exceeded.
+    Thread-safe minute-credit limiter shared by the fetch workers.
+    TwelveData's minute limit is CREDIT-based (1 symbol ~= 1 credit for a
+    time_series batch); credits refill at credits_per_min / 60 per second
+    and at most `capacity` can be spent at once.
 
-    If credits_per_min=8:
+    If credits_per_min=8 and capacity=8:
       - batch=8 => 1 call per 60s
       - batch=4 => 1 call per 30s (2 calls/min)
-    """
-    if batch_credits <= 0:
-        return time.time()
-
-    # Required spacing to stay under credits/min
-    min_gap = 60.0 * (batch_credits / max(1, CREDITS_PER_MIN))
 
-    now = time.time()
-    gap = now - last_req_time
-    if gap < min_gap:
-        time.sleep(min_gap - gap)
+    Spacing is measured between call starts, so response time and file
+    writes no longer add to every gap.
+    """
 
-    return time.time()
+    def __init__(self, credits_per_min: int, capacity: int):
+        self.rate = max(1, credits_per_min) / 60.0
+        self.capacity = float(max(1, capacity))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, credits: int) -> None:
+        need = min(float(credits), self.capacity)
+        if need <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= need:
+                    self.tokens -= need
+                    return
+                wait = (need - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def backoff(self, seconds: float) -> None:
+        """
+        Provider says the minute budget is spent (other clients, plan change):
+        hold ALL workers until a full batch is affordable `seconds` from now.
+        """
+        with self.lock:
+            self.tokens = min(self.tokens, self.capacity - seconds * self.rate)
+            self.last_refill = time.monotonic()
+
+
+def fetch_batch(td: TDClient, bucket: CreditBucket, i: int, n_batches: int, batch: List[str]) -> Dict[str, object]:
+    """
+    Worker: one time_series call for the batch (HTTP + JSON split per symbol).
+    Retries the SAME batch if TwelveData says "out of credits for the current minute".
+    """
+    while True:
+        bucket.acquire(len(batch))
+        try:
+            ts = td.time_series(
+                symbol=batch,
+                interval=INTERVAL,
+                start_date=START_DATE,
+                end_date=END_DATE,
+                outputsize=OUTPUTSIZE,
+                timezone=TZ,
+                order="asc",
+            )
+            return split_batch_json(batch, ts.price_endpoint.as_json())
+        except Exception as e_req:
+            msg = str(e_req).lower()
+            if "run out of api credits for the current minute" in msg or "out of api credits" in msg:
+                print(f"[RATE] minute credits hit; pausing ~65s then retrying batch {i}/{n_batches} (size={len(batch)})")
+                bucket.backoff(65)
+                continue
+            raise
 
 
 def main() -> None:
@@ -178,12 +382,24 @@ def main() -> None:
         raise RuntimeError("TWELVEDATA_API_KEY missing in .env")
 
     uni_path = latest_trade_ready_universe()
-    uni = pd.read_csv(uni_path)
+    # Only the ticker column is needed
+    if uni_path.suffix == ".parquet":
+        uni = pd.read_parquet(uni_path, columns=["ticker"])
+    else:
+        uni = pd.read_csv(uni_path, usecols=["ticker"])
     tickers = sorted(uni["ticker"].astype(str).str.upper().str.strip().unique().tolist())
 
     done = read_done_set()
     remaining = [t for t in tickers if t not in done]
 
+    # Parquets already complete on disk (e.g. progress log lost) need no API call
+    exp_dt = pd.to_datetime(EXPECTED_LAST_DATE, errors="coerce")
+    on_disk_n = 0
+    if pd.notna(exp_dt):
+        before = len(remaining)
+        remaining = [t for t in remaining if not footer_complete(t, exp_dt)]
+        on_disk_n = before - len(remaining)
+
     # ---- optional smoke-test limiting ----
     if SMOKE_TICKERS:
         forced = [x.strip().upper() for x in SMOKE_TICKERS.split(",") if x.strip()]
@@ -207,16 +423,22 @@ def main() -> None:
 
     print("\n=== Twelve Data :: Fetch Daily OHLCV (3y) ===")
     print(f"[ROOT] {ROOT}")
-    print(f"[UNI]  {uni_path.name}  tickers={len(tickers)} remaining={len(remaining)}")
+    print(f"[UNI]  {uni_path.name}  tickers={len(tickers)} remaining={len(remaining)} complete_on_disk={on_disk_n}")
     print(f"[WIN]  {START_DATE} → {END_DATE}  [{INTERVAL}] tz={TZ}")
-    print(f"[CFG]  batch={batch_size_eff} credits_per_min={CREDITS_PER_MIN}")
+    print(f"[CFG]  batch={batch_size_eff} credits_per_min={CREDITS_PER_MIN} workers={FETCH_WORKERS}")
     print(f"[GATE] expected_last={EXPECTED_LAST_DATE} (rows<{MIN_ROWS_OK} => ok_short_history, still skipped next run)")
     print(f"[OUT]  {OUT_DIR}  (parquets/, meta/, _progress.jsonl)")
 
     td = TDClient(apikey=API_KEY)
 
-    last_req_time = 0.0
+    # Logs stay open for the run (buffered, flushed every 50 records and at exit)
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    atexit.register(progress_log.close)
+    atexit.register(errors_log.close)
+
     batches = chunk(remaining, max(1, batch_size_eff))
+    bucket = CreditBucket(CREDITS_PER_MIN, capacity=batch_size_eff)
 
     ok_n = 0
     partial_n = 0
@@ -224,76 +446,33 @@ def main() -> None:
     total_remaining = len(remaining)
     processed_n = 0
 
-    for i, batch in enumerate(batches, start=1):
-        print(f"[BATCH] {i}/{len(batches)} size={len(batch)} first={batch[0]} last={batch[-1]}")
-        last_req_time = sleep_for_rate_limit(last_req_time, batch_credits=len(batch))
-
-        try:
-            # Retry the SAME batch if TwelveData says "out of credits for the current minute"
-            while True:
-                try:
-                    ts = td.time_series(
-                        symbol=batch,
-                        interval=INTERVAL,
-                        start_date=START_DATE,
-                        end_date=END_DATE,
-                        outputsize=OUTPUTSIZE,
-                        timezone=TZ,
-                        order="asc",
-                    )
-                    df = ts.as_pandas()
-                    last_req_time = time.time()
-                    break
-                except Exception as e_req:
-                    msg = str(e_req).lower()
-                    if "run out of api credits for the current minute" in msg or "out of api credits" in msg:
-                        print(f"[RATE] minute credits hit; sleeping ~65s then retrying batch {i}/{len(batches)} (size={len(batch)})")
-                        time.sleep(65)
-                        last_req_time = time.time()
-                        continue
-                    raise
-
-            if df is None or len(df) == 0:
-                raise RuntimeError("Empty response")
-
-            # Batch .as_pandas usually returns MultiIndex (symbol, datetime)
-            if isinstance(df.index, pd.MultiIndex):
-                for sym in batch:
-                    try:
-                        if sym not in df.index.get_level_values(0):
-                            raise KeyError(f"Symbol missing from batch response: {sym}")
-                        sub = df.xs(sym, level=0).reset_index()
-
-                        # If neither datetime nor date exist, assume first col is time and rename it.
-                        if "datetime" not in sub.columns and "date" not in sub.columns and len(sub.columns) > 0:
-                            sub = sub.rename(columns={sub.columns[0]: "datetime"})
+    # Fetch workers only do HTTP + parsing; per-symbol parquet writes go to
+    # write_pool, meta/log writes stay on this thread
+    with ThreadPoolExecutor(max_workers=max(1, FETCH_WORKERS)) as ex, \
+            ThreadPoolExecutor(max_workers=max(1, WRITE_WORKERS)) as write_pool:
+        futures = {
+            ex.submit(fetch_batch, td, bucket, i, len(batches), batch): (i, batch)
+            for i, batch in enumerate(batches, start=1)
+        }
 
-                        sub = normalize_ohlcv(sub)
+        for k, fut in enumerate(as_completed(futures), start=1):
+            i, batch = futures[fut]
+            print(f"[BATCH] {i}/{len(batches)} size={len(batch)} first={batch[0]} last={batch[-1]}")
 
-                        out_path = PARQUETS_DIR / f"{sym}.parquet"
-                        sub.to_parquet(out_path, index=False)
+            try:
+                parts = fut.result()
 
-                        ok, first_s, last_s, rows, ok_reason = coverage_status(sub)
+                # Per-symbol frames straight from the JSON; writes fan out,
+                # logs stay on this thread in batch order
+                sym_futs = [(sym, write_pool.submit(save_batch_symbol, parts[sym], sym)) for sym in batch]
+                for sym, sym_fut in sym_futs:
+                    try:
+                        out_path, (ok, first_s, last_s, rows, ok_reason) = sym_fut.result()
                         status = ok_reason if ok else "partial"
+                        now_iso = utc_now_iso()  # one stamp for this ticker's progress + meta
 
-                        append_jsonl(PROGRESS_JSONL, {
-                            "asof_utc": utc_now_iso(),
-                            "status": status,
-                            "ticker": sym,
-                            "rows": rows,
-                            "first_date": first_s,
-                            "last_date": last_s,
-                            "expected_last_date": EXPECTED_LAST_DATE,
-                            "min_rows_ok": MIN_ROWS_OK,
-                            "batch_i": i,
-                            "batch_size": len(batch),
-                            "start_date": START_DATE,
-                            "end_date": END_DATE,
-                        })
-
-                        meta_path = META_DIR / f"{sym}.meta.json"
-                        meta = {
-                            "asof_utc": utc_now_iso(),
+                        (META_DIR / f"{sym}.meta.json").write_text(dumps_json({
+                            "asof_utc": now_iso,
                             "provider": "twelvedata",
                             "ticker": sym,
                             "interval": INTERVAL,
@@ -307,9 +486,24 @@ def main() -> None:
                             "min_rows_ok": MIN_ROWS_OK,
                             "status": status,
                             "output": str(out_path),
-                        }
-                        meta_path.parent.mkdir(parents=True, exist_ok=True)
-                        meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+                        }, indent=True), encoding="utf-8")
+
+                        # Progress last: the next run skips whatever is logged here, so only
+                        # after the parquet and meta are both on disk
+                        progress_log.write({
+                            "asof_utc": now_iso,
+                            "status": status,
+                            "ticker": sym,
+                            "rows": rows,
+                            "first_date": first_s,
+                            "last_date": last_s,
+                            "expected_last_date": EXPECTED_LAST_DATE,
+                            "min_rows_ok": MIN_ROWS_OK,
+                            "batch_i": i,
+                            "batch_size": len(batch),
+                            "start_date": START_DATE,
+                            "end_date": END_DATE,
+                        })
 
                         processed_n += 1
                         if status in ("ok", "ok_short_history"):
@@ -318,100 +512,42 @@ def main() -> None:
                             partial_n += 1
 
                     except Exception as e_sym:
-                        try:
-                            idx_names = list(df.index.names) if isinstance(df.index, pd.MultiIndex) else [df.index.name]
-                        except Exception:
-                            idx_names = ["<unknown>"]
-
-                        append_jsonl(ERRORS_JSONL, {
+                        errors_log.write({
                             "asof_utc": utc_now_iso(),
                             "status": "error",
                             "ticker": sym,
                             "batch_i": i,
                             "error": str(e_sym),
-                            "df_index_names": idx_names,
                         })
 
                         processed_n += 1
                         err_n += 1
 
-            else:
-                # Some responses might come single-frame; handle defensively
-                if len(batch) != 1:
-                    raise RuntimeError("Non-multiindex response for a batch > 1")
-
-                sym = batch[0]
-                sub = normalize_ohlcv(df.reset_index(drop=False))
-
-                out_path = PARQUETS_DIR / f"{sym}.parquet"
-                sub.to_parquet(out_path, index=False)
-
-                ok, first_s, last_s, rows, ok_reason = coverage_status(sub)
-                status = ok_reason if ok else "partial"
-
-                append_jsonl(PROGRESS_JSONL, {
-                    "asof_utc": utc_now_iso(),
-                    "status": status,
-                    "ticker": sym,
-                    "rows": rows,
-                    "first_date": first_s,
-                    "last_date": last_s,
-                    "expected_last_date": EXPECTED_LAST_DATE,
-                    "min_rows_ok": MIN_ROWS_OK,
-                    "batch_i": i,
-                    "batch_size": len(batch),
-                    "start_date": START_DATE,
-                    "end_date": END_DATE,
-                })
-
-                meta_path = META_DIR / f"{sym}.meta.json"
-                meta = {
-                    "asof_utc": utc_now_iso(),
-                    "provider": "twelvedata",
-                    "ticker": sym,
-                    "interval": INTERVAL,
-                    "start_date": START_DATE,
-                    "end_date": END_DATE,
-                    "timezone": TZ,
-                    "rows": rows,
-                    "first_date": first_s,
-                    "last_date": last_s,
-                    "expected_last_date": EXPECTED_LAST_DATE,
-                    "min_rows_ok": MIN_ROWS_OK,
-                    "status": status,
-                    "output": str(out_path),
-                }
-                meta_path.parent.mkdir(parents=True, exist_ok=True)
-                meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
-
-                processed_n += 1
-                if status in ("ok", "ok_short_history"):
-                    ok_n += 1
-                else:
-                    partial_n += 1
-
-            if i % 5 == 0 or i == len(batches):
-                pct = (processed_n / total_remaining * 100.0) if total_remaining else 100.0
-                print(
-                    f"[PROG] batch={i}/{len(batches)}  "
-                    f"done={processed_n}/{total_remaining} ({pct:.1f}%)  "
-                    f"ok={ok_n} partial={partial_n} err={err_n}"
-                )
-
-        except Exception as e:
-            for sym in batch:
-                append_jsonl(ERRORS_JSONL, {
-                    "asof_utc": utc_now_iso(),
-                    "status": "error",
-                    "ticker": sym,
-                    "batch_i": i,
-                    "error": str(e),
-                })
-                processed_n += 1
-                err_n += 1
-
-            print(f"[WARN] batch {i}/{len(batches)} failed: {e}")
+                if k % 5 == 0 or k == len(batches):
+                    pct = (processed_n / total_remaining * 100.0) if total_remaining else 100.0
+                    print(
+                        f"[PROG] batch={k}/{len(batches)}  "
+                        f"done={processed_n}/{total_remaining} ({pct:.1f}%)  "
+                        f"ok={ok_n} partial={partial_n} err={err_n}"
+                    )
 
+            except Exception as e:
+                now_iso = utc_now_iso()
+                for sym in batch:
+                    errors_log.write({
+                        "asof_utc": now_iso,
+                        "status": "error",
+                        "ticker": sym,
+                        "batch_i": i,
+                        "error": str(e),
+                    })
+                    processed_n += 1
+                    err_n += 1
+
+                print(f"[WARN] batch {i}/{len(batches)} failed: {e}")
+
+    progress_log.close()
+    errors_log.close()
     print("\n[OK] Fetch run complete. You can re-run the script anytime; it will skip completed tickers.")
 
 
@@ -5,6 +5,7 @@ import re
 from pathlib import Path
 from typing import Optional
 
+import numpy as np
 import pandas as pd
 
 
@@ -38,54 +39,39 @@ def pick_col(df: pd.DataFrame, candidates: list[str]) -> Optional[str]:
     return None
 
 
-def parse_market_cap_to_usd(x) -> Optional[float]:
+# Suffix -> multiplier for '300M' / '1.2B' style caps
+_MCAP_RE = re.compile(r"^([0-9]*\.?[0-9]+)\s*([KMBT])$")
+_MCAP_MULT = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+# spider_id cleanup (make_spider_id and the vectorized column version)
+_RE_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+_RE_UNDERSCORES = re.compile(r"_+")
+
+
+def parse_market_cap_to_usd_series(col: pd.Series) -> pd.Series:
     """
-    Accepts:
+    Vectorized market cap -> float USD (NaN when unparseable). Accepts:
       - numeric already
       - strings like '300M', '1.2B', '950K'
       - strings like '$1.2B'
       - strings like '1,234,567,890'
-    Returns float USD or None.
     """
-    if x is None or (isinstance(x, float) and pd.isna(x)):
-        return None
-
-    # already numeric
-    if isinstance(x, (int, float)):
-        v = float(x)
-        if pd.isna(v):
-            return None
-        return v
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype("float64")
 
-    s = str(x).strip()
-    if not s:
-        return None
+    s = col.astype("string").str.strip().str.replace("$", "", regex=False).str.replace(",", "", regex=False).str.upper()
 
-    s = s.replace("$", "").replace(",", "").upper()
-
-    # Pure numeric
-    try:
-        return float(s)
-    except Exception:
-        pass
-
-    # Suffix pattern
-    m = re.match(r"^([0-9]*\.?[0-9]+)\s*([KMBT])$", s)
-    if not m:
-        return None
-
-    num = float(m.group(1))
-    suf = m.group(2)
-    mult = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}.get(suf, None)
-    if mult is None:
-        return None
-    return num * mult
+    # Pure numeric first, suffix pattern for the rest
+    num = pd.to_numeric(s, errors="coerce").astype("float64")
+    ext = s.str.extract(_MCAP_RE)
+    suf = pd.to_numeric(ext[0], errors="coerce").astype("float64") * ext[1].map(_MCAP_MULT).astype("float64")
+    return num.fillna(suf)
 
 
 def make_spider_id(sector: str) -> str:
     s = str(sector).strip().upper()
-    s = re.sub(r"[^A-Z0-9]+", "_", s)
-    s = re.sub(r"_+", "_", s).strip("_")
+    s = _RE_NON_ALNUM.sub("_", s)
+    s = _RE_UNDERSCORES.sub("_", s).strip("_")
     return f"SECTOR_{s}"
 
 
@@ -120,7 +106,7 @@ def main() -> None:
     df["sector"] = df["sector"].astype(str).str.strip()
 
     # Parse market cap into USD float
-    df["market_cap_usd"] = df["market_cap_raw"].apply(parse_market_cap_to_usd)
+    df["market_cap_usd"] = parse_market_cap_to_usd_series(df["market_cap_raw"])
 
     # Drop junk rows
     df = df[df["ticker"].notna() & (df["ticker"] != "")]
@@ -132,12 +118,17 @@ def main() -> None:
         print(f"[WARN] market_cap_usd missing for {missing_mcap_n} rows. Dropping them for spider weights.")
         df = df.dropna(subset=["market_cap_usd"])
 
-    # Build spider_id
-    df["spider_id"] = df["sector"].apply(make_spider_id)
+    # Build spider_id (same rule as make_spider_id, one regex pass over the column)
+    df["spider_id"] = "SECTOR_" + (
+        df["sector"].str.upper().str.replace(_RE_NON_ALNUM, "_", regex=True).str.strip("_")
+    )
 
     # Compute weights per sector spider
-    df["spider_mcap_sum"] = df.groupby("spider_id")["market_cap_usd"].transform("sum")
-    df["weight"] = df["market_cap_usd"] / df["spider_mcap_sum"]
+    # Per-spider sums (one row per sector) broadcast back with a plain map
+    sums = df.groupby("spider_id")["market_cap_usd"].sum()
+    df["spider_mcap_sum"] = df["spider_id"].map(sums)
+    with np.errstate(divide="ignore", invalid="ignore"):  # zero-sum spiders are dropped below
+        df["weight"] = df["market_cap_usd"].to_numpy() / df["spider_mcap_sum"].to_numpy()
 
     # Sanity: remove any spiders with bad sums (e.g. zero)
     df = df[df["spider_mcap_sum"] > 0].copy()
@@ -20,19 +20,34 @@ Key rules (LOCKED):
 
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 import json
+import os
+import sys
 import time
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is optional; date_sums falls back to np.add.at
+    njit = None
 
 # =========================
 # CONFIG (EDIT HERE ONLY)
 # =========================
 ROOT = Path(__file__).resolve().parents[2]  # research/experiments/.. -> project root
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from research.pipeline_io import JsonlWriter, ordered_map, worker_error
 
 MEMBERSHIPS_CSV = ROOT / "data" / "metadata" / "spiders" / "spider_memberships.csv"
 
@@ -56,14 +71,30 @@ MIN_DAILY_COVERAGE = 0.10
 # Liveness logging
 PRINT_EVERY_TICKERS = 25
 
+# Spiders built concurrently in worker processes (1 = sequential)
+N_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Member parquets read ahead per spider (threads inside each worker; 1 = inline)
+READ_WORKERS = 4
+
 
 # =========================
 # Utilities
 # =========================
-def append_jsonl(path: Path, obj: dict) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def write_spider_parquet(df: pd.DataFrame, path: Path) -> None:
+    """
+    Spider OHLCV -> zstd parquet. Only members_used (a small int range) is
+    dictionary-encoded; dates and prices are near-unique.
+    """
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=["members_used"],
+        write_statistics=True,
+    )
 
 
 def try_read_member_parquet(ticker: str) -> Optional[pd.DataFrame]:
@@ -71,9 +102,6 @@ def try_read_member_parquet(ticker: str) -> Optional[pd.DataFrame]:
     Return dataframe if parquet exists + is readable; otherwise return None.
     Missing/failed members are logged by caller.
     """
-    p = PRICES_PARQUETS_DIR / f"{ticker}.parquet"
-    if not p.exists():
-        return None
     try:
         return safe_read_member_parquet(ticker)
     except Exception:
@@ -103,39 +131,89 @@ def safe_read_member_parquet(ticker: str) -> pd.DataFrame:
     if not p.exists():
         raise FileNotFoundError(f"Missing parquet for {ticker}: {p}")
 
-    df = pd.read_parquet(p)
-
     # Accept common schemas; normalize to required columns.
     # We expect at least: date + open/high/low/close + volume
     # Date column could be "date" or "time" depending on writer.
+    # Columns are resolved from the footer schema so only those are read.
+    names = pq.read_schema(p, memory_map=True).names
     date_col = None
     for c in ["date", "time", "datetime", "time_utc"]:
-        if c in df.columns:
+        if c in names:
             date_col = c
             break
     if date_col is None:
-        raise KeyError(f"{ticker} parquet missing a date/time column. cols={list(df.columns)}")
-
-    # Normalize date index
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce").dt.date
-    df = df.dropna(subset=[date_col])
-    df = df.rename(columns={date_col: "date"})
+        raise KeyError(f"{ticker} parquet missing a date/time column. cols={names}")
 
     needed = ["open", "high", "low", "close"]
     for c in needed:
-        if c not in df.columns:
-            raise KeyError(f"{ticker} parquet missing column '{c}'. cols={list(df.columns)}")
+        if c not in names:
+            raise KeyError(f"{ticker} parquet missing column '{c}'. cols={names}")
+
+    cols = [date_col, *needed] + (["volume"] if "volume" in names else [])
+    tbl = pq.read_table(p, columns=cols, memory_map=True, use_threads=False)
+
+    # Normalize date index to datetime64[ns] midnights (no datetime.date
+    # objects, so factorize/sort downstream stay on the fast paths). Naive
+    # timestamps (what 06 writes) and dates are truncated in Arrow; anything
+    # else (strings, tz-aware) goes through pandas, keeping the local date.
+    dtype = tbl.schema.field(date_col).type
+    arrow_date = pa.types.is_date(dtype) or (pa.types.is_timestamp(dtype) and dtype.tz is None)
+    if arrow_date:
+        i = tbl.schema.get_field_index(date_col)
+        day = pc.cast(tbl.column(i), pa.date32(), safe=False)
+        tbl = tbl.set_column(i, date_col, pc.cast(day, pa.timestamp("ns")))
+
+    df = tbl.to_pandas(self_destruct=True, split_blocks=True)
+    del tbl
+
+    if not arrow_date:
+        d = pd.to_datetime(df[date_col], errors="coerce")
+        if d.dt.tz is not None:
+            d = d.dt.tz_localize(None)
+        df[date_col] = d.dt.normalize().astype("datetime64[ns]")
+    if df[date_col].hasnans:
+        df = df.dropna(subset=[date_col])
+    df = df.rename(columns={date_col: "date"})
+
     if "volume" not in df.columns:
         # allow volume missing; fill with 0
         df["volume"] = 0.0
 
-    # Keep only required cols
-    df = df[["date", "open", "high", "low", "close", "volume"]].drop_duplicates(subset=["date"])
-    df = df.sort_values("date")
+    # Keep only required cols (06 parquets are already unique + ascending)
+    df = df[["date", "open", "high", "low", "close", "volume"]]
+    if not (df["date"].is_monotonic_increasing and df["date"].is_unique):
+        df = df.drop_duplicates(subset=["date"]).sort_values("date")
     return df
 
 
+def _date_sums_loop(codes: np.ndarray, vals: np.ndarray, out: np.ndarray) -> None:
+    """out[:, codes[k]] += vals[:, k], one row at a time in k order."""
+    for k in range(codes.shape[0]):
+        j = codes[k]
+        for r in range(vals.shape[0]):
+            out[r, j] += vals[r, k]
+
+
+_date_sums_jit = njit(cache=True, nogil=True)(_date_sums_loop) if njit is not None else None
+
+
+def date_sums(codes: np.ndarray, vals: np.ndarray, n_dates: int) -> np.ndarray:
+    """
+    Per-date sums of every row of vals (shape [fields, bars]) into [fields, n_dates].
+
+    Bars are added strictly in order (member by member), so results match a
+    running member total exactly and a NaN poisons its date. Numba fuses all
+    fields into one pass; without it each field goes through np.add.at.
+    """
+    out = np.zeros((vals.shape[0], n_dates))
+    if _date_sums_jit is not None:
+        _date_sums_jit(codes, vals, out)
+    else:
+        for r in range(vals.shape[0]):
+            np.add.at(out[r], codes, vals[r])
+    return out
+
+
 @dataclass
 class SpiderBuildResult:
     spider_id: str
@@ -151,109 +229,94 @@ def build_spider_series(spider_id: str, members_df: pd.DataFrame) -> Tuple[pd.Da
     """
     Build one spider OHLCV series from member parquets.
 
-    members_df columns: ticker, weight
+    members_df columns: ticker (str), weight (float); read only, never modified.
     """
     t0 = time.time()
 
-    members_df = members_df.copy()
-    members_df["ticker"] = members_df["ticker"].astype(str)
-    members_df["weight"] = members_df["weight"].astype(float)
-
     # Optional smoke mode
     if SMOKE_MAX_TICKERS_PER_SPIDER is not None:
         members_df = members_df.head(int(SMOKE_MAX_TICKERS_PER_SPIDER))
 
-    tickers = members_df["ticker"].tolist()
-    weights = dict(zip(members_df["ticker"], members_df["weight"]))
-    members_total = len(tickers)
-
-    # Pass 1: gather union of dates across members (small & safe)
-    all_dates: set = set()
-    for i, tkr in enumerate(tickers, 1):
-
-        df_t = try_read_member_parquet(tkr)
+    members_total = len(members_df)
+
+    # Single pass: collect the bars of every weighted member into flat arrays
+    # (one entry per member-date where close is present), then sum per date.
+    # Dates without any weighted member bar could never pass the coverage
+    # filter (MIN_DAILY_COVERAGE > 0), so the union only needs these rows.
+    parts: Dict[str, List[np.ndarray]] = {k: [] for k in ["date", "open", "high", "low", "close", "vol", "w"]}
+    jobs = []
+    for i, (tkr, w) in enumerate(zip(members_df["ticker"].tolist(), members_df["weight"].tolist()), 1):
+        if w > 0:
+            jobs.append((i, tkr, w))
+
+    # Reads overlap on a small thread pool; map() keeps member order so the
+    # per-date sums below are accumulated in the same order as before.
+    if READ_WORKERS > 1 and len(jobs) > 1:
+        pool = ThreadPoolExecutor(max_workers=READ_WORKERS)
+        frames = pool.map(try_read_member_parquet, [tkr for _, tkr, _ in jobs])
+    else:
+        pool = None
+        frames = map(try_read_member_parquet, [tkr for _, tkr, _ in jobs])
+
+    for (i, tkr, w), df_t in zip(jobs, frames):
         if df_t is None:
             continue
-        all_dates.update(df_t["date"].tolist())
-
-        if i % PRINT_EVERY_TICKERS == 0 or i == members_total:
-            print(f"  [{spider_id}] scanned dates {i}/{members_total}")
-
-    if not all_dates:
-        out = pd.DataFrame(columns=["date", "open", "high", "low", "close", "volume", "members_used", "weight_coverage"])
-        res = SpiderBuildResult(spider_id, 0, None, None, members_total, 0.0, 0.0)
-        return out, res
 
-    idx = pd.Index(sorted(all_dates), name="date")
-
-    # Aggregators (numerators)
-    agg_open = pd.Series(0.0, index=idx)
-    agg_high = pd.Series(0.0, index=idx)
-    agg_low  = pd.Series(0.0, index=idx)
-    agg_close= pd.Series(0.0, index=idx)
-    agg_vol  = pd.Series(0.0, index=idx)
-
-    # Denominator (weight coverage) + members used
-    w_cov = pd.Series(0.0, index=idx)
-    members_used = pd.Series(0, index=idx, dtype="int32")
-
-    # Pass 2: accumulate weighted OHLC + volume
-    for i, tkr in enumerate(tickers, 1):
-        w = float(weights.get(tkr, 0.0))
-        if w <= 0:
+        close = df_t["close"].to_numpy(dtype=float)
+        # Use mask on close (if close present, we assume the bar is present)
+        mask = ~np.isnan(close)
+        if not mask.any():
             continue
 
-        df_t0 = try_read_member_parquet(tkr)
-        if df_t0 is None:
-            continue
-        df_t = df_t0.set_index("date")
+        parts["date"].append(df_t["date"].to_numpy()[mask])
+        parts["open"].append(w * df_t["open"].to_numpy(dtype=float)[mask])
+        parts["high"].append(w * df_t["high"].to_numpy(dtype=float)[mask])
+        parts["low"].append(w * df_t["low"].to_numpy(dtype=float)[mask])
+        parts["close"].append(w * close[mask])
+        # Volume: sum (unweighted)
+        parts["vol"].append(df_t["volume"].fillna(0.0).to_numpy(dtype=float)[mask])
+        parts["w"].append(np.full(int(mask.sum()), w))
 
-        # Align to spider index without wide merges
-        close = df_t["close"].reindex(idx)
-        mask = close.notna()
-        if not mask.any():
-            continue
+        if i % PRINT_EVERY_TICKERS == 0 or i == members_total:
+            print(f"  [{spider_id}] aggregated {i}/{members_total}")
 
-        open_ = df_t["open"].reindex(idx)
-        high  = df_t["high"].reindex(idx)
-        low   = df_t["low"].reindex(idx)
-        vol   = df_t["volume"].reindex(idx).fillna(0.0)
+    if pool is not None:
+        pool.shutdown()
 
-        # Use mask on close (if close present, we assume the bar is present)
-        agg_open.loc[mask]  += w * open_.loc[mask].astype(float)
-        agg_high.loc[mask]  += w * high.loc[mask].astype(float)
-        agg_low.loc[mask]   += w * low.loc[mask].astype(float)
-        agg_close.loc[mask] += w * close.loc[mask].astype(float)
+    if not parts["date"]:
+        out = pd.DataFrame(columns=["date", "open", "high", "low", "close", "volume", "members_used", "weight_coverage"])
+        res = SpiderBuildResult(spider_id, 0, None, None, members_total, 0.0, 0.0)
+        return out, res
 
-        # Volume: sum (unweighted)
-        agg_vol.loc[mask] += vol.loc[mask].astype(float)
+    codes, uniq = pd.factorize(np.concatenate(parts.pop("date")), sort=True)
+    idx = pd.Index(uniq, name="date")
 
-        w_cov.loc[mask] += w
-        members_used.loc[mask] += 1
+    keys = ["open", "high", "low", "close", "vol", "w"]
+    sums = date_sums(codes, np.vstack([np.concatenate(parts[k]) for k in keys]), len(idx))
+    agg_open, agg_high, agg_low, agg_close, agg_vol, w_cov = sums
 
-        if i % PRINT_EVERY_TICKERS == 0 or i == members_total:
-            print(f"  [{spider_id}] aggregated {i}/{members_total}")
+    # members used per date (w_cov above is the weight-coverage denominator)
+    members_used = np.bincount(codes, minlength=len(idx)).astype(np.int32)
 
-    # Finalize: renormalize by coverage
+    # Finalize: renormalize by coverage (plain arrays; idx is already sorted)
     valid = w_cov >= float(MIN_DAILY_COVERAGE)
     if not valid.any():
         out = pd.DataFrame(columns=["date", "open", "high", "low", "close", "volume", "members_used", "weight_coverage"])
         res = SpiderBuildResult(spider_id, 0, None, None, members_total, 0.0, 0.0)
         return out, res
 
+    cov = w_cov[valid]
     out = pd.DataFrame({
         "date": idx[valid].astype(str),
-        "open":  (agg_open[valid]  / w_cov[valid]).values,
-        "high":  (agg_high[valid]  / w_cov[valid]).values,
-        "low":   (agg_low[valid]   / w_cov[valid]).values,
-        "close": (agg_close[valid] / w_cov[valid]).values,
-        "volume": agg_vol[valid].values,
-        "members_used": members_used[valid].values.astype(int),
-        "weight_coverage": w_cov[valid].values,
+        "open":  agg_open[valid]  / cov,
+        "high":  agg_high[valid]  / cov,
+        "low":   agg_low[valid]   / cov,
+        "close": agg_close[valid] / cov,
+        "volume": agg_vol[valid],
+        "members_used": members_used[valid].astype(int),
+        "weight_coverage": cov,
     })
 
-    out = out.sort_values("date").reset_index(drop=True)
-
     first_date = out["date"].iloc[0] if len(out) else None
     last_date = out["date"].iloc[-1] if len(out) else None
 
@@ -274,6 +337,43 @@ def build_spider_series(spider_id: str, members_df: pd.DataFrame) -> Tuple[pd.Da
     return out, res
 
 
+def process_spider(job: Tuple[str, pd.DataFrame, List[str]]) -> Tuple[str, List[str], Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Build + write one spider (runs in a worker process).
+
+    job is (spider_id, members sorted by weight desc, members without a parquet).
+    Returns (spider_id, missing_members, progress record, error); error comes
+    from worker_error.
+    """
+    spider_id, sub, missing_members = job
+    t0 = time.time()
+    try:
+        # Build series
+        out_df, res = build_spider_series(spider_id, sub)
+
+        # Write parquet
+        out_path = OUT_DIR / f"{spider_id}.parquet"
+        write_spider_parquet(out_df, out_path)
+
+        rec = {
+            "spider_id": spider_id,
+            "status": "ok",
+            "rows": res.rows,
+            "first_date": res.first_date,
+            "last_date": res.last_date,
+            "members_total": res.members_total,
+            "missing_members_count": len(missing_members),
+            "members_used_median": res.members_used_median,
+            "coverage_median": res.coverage_median,
+            "elapsed_s": round(time.time() - t0, 3),
+            "out": str(out_path),
+        }
+        return spider_id, missing_members, rec, None
+
+    except Exception as e:
+        return spider_id, missing_members, None, worker_error(e)
+
+
 def main() -> None:
     OUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -292,6 +392,7 @@ def main() -> None:
 
     mem["spider_id"] = mem["spider_id"].astype(str)
     mem["ticker"] = mem["ticker"].astype(str)
+    mem["weight"] = mem["weight"].astype(float)
 
     # Optional subset
     spiders = sorted(mem["spider_id"].unique().tolist())
@@ -314,18 +415,29 @@ def main() -> None:
         print("[OK] Nothing to do.")
         return
 
-    for spider_id in remaining:
-        t0 = time.time()
-        try:
-            sub = mem[mem["spider_id"] == spider_id].sort_values("weight", ascending=False)
-
-            missing_members = []
-            for tkr in sub["ticker"].astype(str).tolist():
-                if not (PRICES_PARQUETS_DIR / f"{tkr}.parquet").exists():
-                    missing_members.append(tkr)
-
+    # One directory listing instead of a stat() per member per spider
+    available = {e.name[:-len(".parquet")] for e in os.scandir(PRICES_PARQUETS_DIR) if e.name.endswith(".parquet")}
+
+    subs = dict(tuple(mem.groupby("spider_id", sort=False)))
+    jobs = []
+    for sid in remaining:
+        sub = subs[sid].sort_values("weight", ascending=False)
+        missing_members = [t for t in sub["ticker"].tolist() if t not in available]
+        jobs.append((sid, sub, missing_members))
+
+    # Compile date_sums once here, before the pool starts: forked workers
+    # inherit it and spawned ones load the cache=True build from disk,
+    # instead of every worker paying the JIT on its first spider.
+    date_sums(np.zeros(1, dtype=np.intp), np.zeros((6, 1)), 1)
+
+    # Spiders are independent; workers only build + write parquets and the
+    # JSONL logs are appended here, in spider order.
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    with progress_log, errors_log, ordered_map(process_spider, jobs, workers=N_WORKERS) as results:
+        for spider_id, missing_members, rec, err in results:
             if missing_members:
-                append_jsonl(ERRORS_JSONL, {
+                errors_log.write({
                     "ts": pd.Timestamp.utcnow().isoformat(),
                     "spider_id": spider_id,
                     "status": "missing_member_parquet",
@@ -333,36 +445,16 @@ def main() -> None:
                     "missing": missing_members[:50],  # cap for log hygiene
                 })
 
-            # Build series
-            out_df, res = build_spider_series(spider_id, sub)
-
-            # Write parquet
-            out_path = OUT_DIR / f"{spider_id}.parquet"
-            out_df.to_parquet(out_path, index=False)
-
-            append_jsonl(PROGRESS_JSONL, {
-                "ts": pd.Timestamp.utcnow().isoformat(),
-                "spider_id": spider_id,
-                "status": "ok",
-                "rows": res.rows,
-                "first_date": res.first_date,
-                "last_date": res.last_date,
-                "members_total": res.members_total,
-                "missing_members_count": len(missing_members),
-                "members_used_median": res.members_used_median,
-                "coverage_median": res.coverage_median,
-                "elapsed_s": round(time.time() - t0, 3),
-                "out": str(out_path),
-            })
-
-        except Exception as e:
-            append_jsonl(ERRORS_JSONL, {
-                "ts": pd.Timestamp.utcnow().isoformat(),
-                "spider_id": spider_id,
-                "status": "error",
-                "error": repr(e),
-            })
-            print(f"[ERROR] {spider_id}: {e}")
+            if err is None:
+                progress_log.write({"ts": pd.Timestamp.utcnow().isoformat(), **rec})
+            else:
+                errors_log.write({
+                    "ts": pd.Timestamp.utcnow().isoformat(),
+                    "spider_id": spider_id,
+                    "status": "error",
+                    "error": err[0],
+                })
+                print(f"[ERROR] {spider_id}: {err[1]}")
 
     print("\n[OK] 07B complete.")
 
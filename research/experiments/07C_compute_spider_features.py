@@ -19,18 +19,21 @@ Logs:
 from __future__ import annotations
 
 import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Dict, Any, List
 from types import SimpleNamespace
 import pandas as pd
 
-
 ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from research.pipeline_io import JsonlWriter, ordered_map
+
 SPIDERS_DIR = ROOT / "data" / "raw" / "spiders_daily"
 OUT_DIR = ROOT / "data" / "cleaned" / "spiders_daily" / "features"
 PROGRESS_JSONL = OUT_DIR / "_progress.jsonl"
@@ -41,15 +44,23 @@ INDICATORS_YAML = ROOT / "config" / "indicators.yaml"
 # Optional: smoke mode to run only first N spiders
 SMOKE_N = None  # e.g. 2 for quick test; None for all
 
+# Batch mode: compute all remaining spiders in one grouped kernel call
+# (any failure fails the whole batch, which is logged and then redone per spider)
+BATCH_MODE = False
+
+# Per-spider loop: worker threads (1 = sequential)
+N_WORKERS = os.cpu_count() or 1
+
 
 def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def append_jsonl(path: Path, obj: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def iso_day(v: Any) -> str:
+    """YYYY-MM-DD of a date-like scalar; only non-datetime values go through the parser."""
+    if not hasattr(v, "strftime"):
+        v = pd.Timestamp(v)
+    return v.strftime("%Y-%m-%d")
 
 
 def load_done_set(progress_path: Path) -> set[str]:
@@ -190,48 +201,94 @@ def main() -> None:
         return
 
     # Import builder
-    from features.spiders.build_features import build_spider_features
-
-    for spider_id in remaining:
-        src = SPIDERS_DIR / f"{spider_id}.parquet"
-        out = OUT_DIR / f"{spider_id}.parquet"
-
-        t0 = datetime.now(timezone.utc)
-        try:
-            df = build_spider_features(
-                spider_parquet=src,
-                out_parquet=out,
-                indicators_cfg=indicators_cfg,
-                trim_last_n_days=None,
-            )
-
-            first_date = str(pd.to_datetime(df["date"].iloc[0]).date())
-            last_date = str(pd.to_datetime(df["date"].iloc[-1]).date())
-            rows = int(len(df))
-
-            append_jsonl(
-                PROGRESS_JSONL,
-                {
-                    "ts": utc_now(),
-                    "spider_id": spider_id,
-                    "status": "ok",
-                    "rows": rows,
-                    "first_date": first_date,
-                    "last_date": last_date,
-                    "out": str(out),
-                    "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
-                },
-            )
-            print(f"[DONE] {spider_id}: rows={rows} first={first_date} last={last_date}")
-            ok_n += 1
-
-        except Exception as e:
-            append_jsonl(
-                ERRORS_JSONL,
-                {"ts": utc_now(), "spider_id": spider_id, "status": "error", "error": repr(e)},
-            )
-            print(f"[ERROR] {spider_id}: {e}")
-            err_n += 1
+    from features.spiders.build_features import build_all_spider_features, build_spider_features
+
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    with progress_log, errors_log:
+        if BATCH_MODE:
+            t0 = datetime.now(timezone.utc)
+            try:
+                long = build_all_spider_features(
+                    spiders_dir=SPIDERS_DIR,
+                    out_dir=OUT_DIR,
+                    indicators_cfg=indicators_cfg,
+                    spider_ids=remaining,
+                    trim_last_n_days=None,
+                )
+            except Exception as e:
+                # One bad spider sinks the stacked build; log it and redo the spiders
+                # one by one below so the rest still land and the culprit is named
+                errors_log.write(
+                    {"ts": utc_now(), "status": "error", "batch": True, "spiders": len(remaining), "error": repr(e)},
+                )
+                print(f"[WARN] batch build failed, falling back to per-spider: {e}")
+            else:
+                elapsed = round((datetime.now(timezone.utc) - t0).total_seconds(), 3)
+                for spider_id, df in long.groupby("spider_id", sort=False, observed=True):
+                    first_date = iso_day(df["date"].iat[0])
+                    last_date = iso_day(df["date"].iat[-1])
+                    progress_log.write(
+                        {
+                            "ts": utc_now(),
+                            "spider_id": spider_id,
+                            "status": "ok",
+                            "rows": int(len(df)),
+                            "first_date": first_date,
+                            "last_date": last_date,
+                            "out": str(OUT_DIR / f"{spider_id}.parquet"),
+                            "elapsed_s": elapsed,
+                            "batch": True,
+                        },
+                    )
+                    print(f"[DONE] {spider_id}: rows={len(df)} first={first_date} last={last_date}")
+                print(f"\n[SUMMARY] ok={len(remaining)} error=0 (batch, {elapsed}s)")
+                print("[OK] 07C complete.")
+                return
+
+        def build_one(spider_id: str):
+            t0 = datetime.now(timezone.utc)
+            try:
+                df = build_spider_features(
+                    spider_parquet=SPIDERS_DIR / f"{spider_id}.parquet",
+                    out_parquet=OUT_DIR / f"{spider_id}.parquet",
+                    indicators_cfg=indicators_cfg,
+                    trim_last_n_days=None,
+                )
+                err = None
+            except Exception as e:
+                df, err = None, e
+            return spider_id, df, err, round((datetime.now(timezone.utc) - t0).total_seconds(), 3)
+
+        # Kernels release the GIL, so threads scale across spiders; logging stays on this thread
+        with ordered_map(build_one, remaining, workers=N_WORKERS, executor=ThreadPoolExecutor) as results:
+            for spider_id, df, err, elapsed_s in results:
+                if err is None:
+                    first_date = iso_day(df["date"].iat[0])
+                    last_date = iso_day(df["date"].iat[-1])
+                    rows = int(len(df))
+
+                    progress_log.write(
+                        {
+                            "ts": utc_now(),
+                            "spider_id": spider_id,
+                            "status": "ok",
+                            "rows": rows,
+                            "first_date": first_date,
+                            "last_date": last_date,
+                            "out": str(OUT_DIR / f"{spider_id}.parquet"),
+                            "elapsed_s": elapsed_s,
+                        },
+                    )
+                    print(f"[DONE] {spider_id}: rows={rows} first={first_date} last={last_date}")
+                    ok_n += 1
+
+                else:
+                    errors_log.write(
+                        {"ts": utc_now(), "spider_id": spider_id, "status": "error", "error": repr(err)},
+                    )
+                    print(f"[ERROR] {spider_id}: {err}")
+                    err_n += 1
 
     print(f"\n[SUMMARY] ok={ok_n} error={err_n}")
 
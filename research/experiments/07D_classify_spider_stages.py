@@ -20,17 +20,22 @@ Logs:
 from __future__ import annotations
 
 import json
+import os
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from research.pipeline_io import JsonlWriter, ordered_map, worker_error
+
 IN_DIR = ROOT / "data" / "cleaned" / "spiders_daily" / "features"
 OUT_DIR = ROOT / "data" / "cleaned" / "spiders_daily" / "stages"
 
@@ -41,15 +46,22 @@ STAGES_YAML = ROOT / "config" / "stages.yaml"
 
 SMOKE_N = None  # set to 2 for quick test, else None for all
 
+# Spiders classified concurrently in worker processes (1 = sequential)
+N_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# stages.yaml, loaded once in main() and handed to each worker by _init_worker
+_STAGES_CFG: dict = {}
+
 
 def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def append_jsonl(path: Path, obj: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
+def iso_day(v: Any) -> str:
+    """YYYY-MM-DD of a date-like scalar; only non-datetime values go through the parser."""
+    if not hasattr(v, "strftime"):
+        v = pd.Timestamp(v)
+    return v.strftime("%Y-%m-%d")
 
 
 def load_done_set(progress_path: Path) -> set[str]:
@@ -83,6 +95,23 @@ def load_yaml(path: Path) -> dict:
         return yaml.safe_load(f) or {}
 
 
+# Everything but the date repeats heavily across rows, so it is dictionary-encoded
+STAGE_DICT_COLS = ["stage", "stage_name", "stage_reason", "stage_flags", "spider_id"]
+
+
+def write_stages_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Spider stages -> zstd parquet, same settings as the 07B spider OHLCV files."""
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=[c for c in STAGE_DICT_COLS if c in df.columns],
+        write_statistics=True,
+    )
+
+
 def list_spider_ids(in_dir: Path) -> List[str]:
     return [p.stem for p in sorted(in_dir.glob("SECTOR_*.parquet"))]
 
@@ -118,6 +147,95 @@ def _call_stock_stage_classifier(df: pd.DataFrame, stages_cfg: dict) -> pd.DataF
     )
 
 
+def _init_worker(stages_cfg: dict) -> None:
+    global _STAGES_CFG
+    _STAGES_CFG = stages_cfg
+
+
+def classify_one(spider_id: str) -> Tuple[str, Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Classify + write one spider (runs in a worker process).
+
+    Returns (spider_id, progress record, error); error comes from worker_error.
+    """
+    src = IN_DIR / f"{spider_id}.parquet"
+    out = OUT_DIR / f"{spider_id}.parquet"
+
+    t0 = datetime.now(timezone.utc)
+    try:
+        df = pd.read_parquet(src)
+
+        # Ensure canonical sort
+        if "date" in df.columns:
+            df["date"] = pd.to_datetime(df["date"])
+            df = df.sort_values("date").reset_index(drop=True)
+        else:
+            raise KeyError(f"{spider_id} missing 'date' column")
+
+        staged = _call_stock_stage_classifier(df=df, stages_cfg=_STAGES_CFG)
+
+        # Normalise stage column name for downstream use
+        stage_col = None
+        for c in ("stage", "stage_id", "market_stage"):
+            if c in staged.columns:
+                stage_col = c
+                break
+        if stage_col is None:
+            raise KeyError(
+                f"{spider_id}: stage classifier output missing stage column. "
+                "Expected one of: stage, stage_id, market_stage"
+            )
+
+        # The classifier hands back its own frame, so it is extended in place
+        if stage_col != "stage":
+            staged["stage"] = staged[stage_col].astype(int)
+
+        staged["spider_id"] = spider_id
+
+        # Keep this lean (but include stage_name for readability/debug)
+        keep_cols = [c for c in staged.columns if c in (
+            "date", "spider_id", "stage", "stage_name", "stage_reason", "stage_flags"
+        )]
+
+        # If stage_name is missing, derive it from STAGE_NAMES mapping
+        if "stage_name" not in staged.columns:
+            from stages.stage_classifier import STAGE_NAMES
+            staged["stage_name"] = staged["stage"].map(STAGE_NAMES).fillna("Unknown")
+        if "date" not in keep_cols:
+            keep_cols = ["date"] + keep_cols
+        if "spider_id" not in keep_cols:
+            keep_cols = keep_cols + ["spider_id"]
+        if "stage" not in keep_cols:
+            keep_cols = keep_cols + ["stage"]
+
+        staged_out = staged[keep_cols]
+
+        # Stable column order (audit-friendly)
+        ordered = ["date", "stage", "stage_name", "stage_reason", "spider_id"]
+        extras = [c for c in staged_out.columns if c not in ordered]
+        staged_out = staged_out[[c for c in ordered if c in staged_out.columns] + extras]
+
+        out.parent.mkdir(parents=True, exist_ok=True)
+        write_stages_parquet(staged_out, out)
+
+        first_date = iso_day(staged_out["date"].iat[0])
+        last_date = iso_day(staged_out["date"].iat[-1])
+        rows = int(len(staged_out))
+
+        return spider_id, {
+            "spider_id": spider_id,
+            "status": "ok",
+            "rows": rows,
+            "first_date": first_date,
+            "last_date": last_date,
+            "out": str(out),
+            "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
+        }, None
+
+    except Exception as e:
+        return spider_id, None, worker_error(e)
+
+
 def main() -> None:
     print("\n=== 07D :: Classify Spider Stages (Same Stock Logic) ===")
     print(f"[ROOT] {ROOT}")
@@ -147,94 +265,29 @@ def main() -> None:
     ok_n = 0
     err_n = 0
 
-    for spider_id in remaining:
-        src = IN_DIR / f"{spider_id}.parquet"
-        out = OUT_DIR / f"{spider_id}.parquet"
-
-        t0 = datetime.now(timezone.utc)
-        try:
-            df = pd.read_parquet(src)
+    # Spiders are independent; workers only classify + write parquets and the
+    # JSONL logs are appended here, in spider order.
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    with progress_log, errors_log, ordered_map(
+        classify_one, remaining, workers=N_WORKERS,
+        initializer=_init_worker, initargs=(stages_cfg,),
+    ) as results:
+        for spider_id, rec, err in results:
+            if err is None:
+                progress_log.write({"ts": utc_now(), **rec})
+                print(f"[DONE] {spider_id}: rows={rec['rows']} first={rec['first_date']} last={rec['last_date']}")
+                ok_n += 1
 
-            # Ensure canonical sort
-            if "date" in df.columns:
-                df["date"] = pd.to_datetime(df["date"])
-                df = df.sort_values("date").reset_index(drop=True)
             else:
-                raise KeyError(f"{spider_id} missing 'date' column")
-
-            staged = _call_stock_stage_classifier(df=df, stages_cfg=stages_cfg)
-
-            # Normalise stage column name for downstream use
-            stage_col = None
-            for c in ("stage", "stage_id", "market_stage"):
-                if c in staged.columns:
-                    stage_col = c
-                    break
-            if stage_col is None:
-                raise KeyError(
-                    f"{spider_id}: stage classifier output missing stage column. "
-                    "Expected one of: stage, stage_id, market_stage"
-                )
-
-            staged = staged.copy()
-            if stage_col != "stage":
-                staged["stage"] = staged[stage_col].astype(int)
-
-            staged["spider_id"] = spider_id
-
-            # Keep this lean (but include stage_name for readability/debug)
-            keep_cols = [c for c in staged.columns if c in (
-                "date", "spider_id", "stage", "stage_name", "stage_reason", "stage_flags"
-            )]
-
-            # If stage_name is missing, derive it from STAGE_NAMES mapping
-            if "stage_name" not in staged.columns:
-                from stages.stage_classifier import STAGE_NAMES
-                staged["stage_name"] = staged["stage"].map(STAGE_NAMES).fillna("Unknown")
-            if "date" not in keep_cols:
-                keep_cols = ["date"] + keep_cols
-            if "spider_id" not in keep_cols:
-                keep_cols = keep_cols + ["spider_id"]
-            if "stage" not in keep_cols:
-                keep_cols = keep_cols + ["stage"]
-
-            staged_out = staged[keep_cols].copy()
-
-            # Stable column order (audit-friendly)
-            ordered = ["date", "stage", "stage_name", "stage_reason", "spider_id"]
-            extras = [c for c in staged_out.columns if c not in ordered]
-            staged_out = staged_out[[c for c in ordered if c in staged_out.columns] + extras]
-
-            out.parent.mkdir(parents=True, exist_ok=True)
-            staged_out.to_parquet(out, index=False)
-
-            first_date = str(pd.to_datetime(staged_out["date"].iloc[0]).date())
-            last_date = str(pd.to_datetime(staged_out["date"].iloc[-1]).date())
-            rows = int(len(staged_out))
-
-            append_jsonl(PROGRESS_JSONL, {
-                "ts": utc_now(),
-                "spider_id": spider_id,
-                "status": "ok",
-                "rows": rows,
-                "first_date": first_date,
-                "last_date": last_date,
-                "out": str(out),
-                "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
-            })
-
-            print(f"[DONE] {spider_id}: rows={rows} first={first_date} last={last_date}")
-            ok_n += 1
-
-        except Exception as e:
-            append_jsonl(ERRORS_JSONL, {
-                "ts": utc_now(),
-                "spider_id": spider_id,
-                "status": "error",
-                "error": repr(e),
-            })
-            print(f"[ERROR] {spider_id}: {e}")
-            err_n += 1
+                errors_log.write({
+                    "ts": utc_now(),
+                    "spider_id": spider_id,
+                    "status": "error",
+                    "error": err[0],
+                })
+                print(f"[ERROR] {spider_id}: {err[1]}")
+                err_n += 1
 
     print(f"\n[SUMMARY] ok={ok_n} error={err_n}")
     if ok_n == 0 and err_n > 0:
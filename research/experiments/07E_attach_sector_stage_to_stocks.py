@@ -30,12 +30,15 @@ Logs:
 from __future__ import annotations
 
 import json
+import os
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 # ----------------------------
 # Paths (edit STOCKS_IN_DIR)
@@ -44,6 +47,8 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from research.pipeline_io import JsonlWriter, ordered_map, worker_error
+
 UNIVERSE_CSV = ROOT / "data" / "cleaned" / "universe" / "universe_trade_ready_20260205_133048.csv"
 
 SPIDER_STAGES_DIR = ROOT / "data" / "cleaned" / "spiders_daily" / "stages"
@@ -56,6 +61,13 @@ ERRORS_JSONL = OUT_DIR / "_errors.jsonl"
 
 SMOKE_N: Optional[int] = None  # set e.g. 5 for quick test
 
+# Stocks processed concurrently in worker processes (1 = sequential)
+N_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# Lookups loaded once in main() and handed to each worker by _init_worker
+_UNI_MAP: Dict[str, Dict[str, str]] = {}
+_STAGES_BY_SPIDER: Dict[str, pd.DataFrame] = {}
+
 
 # ----------------------------
 # Helpers
@@ -64,12 +76,6 @@ def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def append_jsonl(path: Path, obj: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-
-
 def load_done_set(progress_path: Path) -> set[str]:
     done = set()
     if not progress_path.exists():
@@ -155,6 +161,27 @@ def load_all_spider_stages(stages_dir: Path) -> pd.DataFrame:
     return out
 
 
+# Stage/sector labels repeat on every row; prices and features are near-unique
+STAGE_DICT_COLS = [
+    "stage", "stage_name", "stage_reason", "stage_flags",
+    "sector_stage", "sector_stage_name", "sector_stage_reason",
+    "sector", "spider_id",
+]
+
+
+def write_stock_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Stock + sector stage -> zstd parquet, same settings as 08B."""
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=[c for c in STAGE_DICT_COLS if c in df.columns],
+        write_statistics=True,
+    )
+
+
 def list_stock_files(in_dir: Path) -> List[Path]:
     return sorted(in_dir.glob("*.parquet"))
 
@@ -176,6 +203,66 @@ def read_stock_parquet(path: Path) -> pd.DataFrame:
     raise KeyError(f"{path.name}: needs 'date' column or DatetimeIndex")
 
 
+def _init_worker(uni_map: Dict[str, Dict[str, str]], stages_by_spider: Dict[str, pd.DataFrame]) -> None:
+    global _UNI_MAP, _STAGES_BY_SPIDER
+    _UNI_MAP = uni_map
+    _STAGES_BY_SPIDER = stages_by_spider
+
+
+def attach_one(p: Path) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Attach the sector stage to one stock and write it (runs in a worker process).
+
+    Returns (progress record, error); error comes from worker_error.
+    """
+    ticker = p.stem  # assumes file name is TICKER.parquet
+    t0 = datetime.now(timezone.utc)
+    try:
+        stock = read_stock_parquet(p)
+
+        # Map sector/spider_id
+        meta = _UNI_MAP.get(ticker)
+        if not meta:
+            raise KeyError(f"{ticker}: not found in universe CSV (ticker column).")
+        sector = meta["sector"]
+        spider_id = meta["spider_id"]
+
+        # Spider stages for this sector (split once in main)
+        sp = _STAGES_BY_SPIDER.get(spider_id)
+        if sp is None or sp.empty:
+            raise KeyError(f"{ticker}: spider stages not found for spider_id={spider_id}")
+
+        # Left join on date against the spider's date index
+        merged = stock.join(sp, on="date")
+
+        # Attach sector metadata
+        merged["sector"] = sector
+        merged["spider_id"] = spider_id
+
+        # Sanity: if all sector_stage are null, date alignment is broken
+        if merged["sector_stage"].isna().all():
+            raise RuntimeError(
+                f"{ticker}: merge produced all-NaN sector_stage. "
+                f"Check date alignment + timezone + spider stages date range for {spider_id}."
+            )
+
+        out_path = OUT_DIR / f"{ticker}.parquet"
+        write_stock_parquet(merged, out_path)
+
+        return {
+            "ticker": ticker,
+            "status": "ok",
+            "sector": sector,
+            "spider_id": spider_id,
+            "rows": int(len(merged)),
+            "out": str(out_path),
+            "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
+        }, None
+
+    except Exception as e:
+        return None, worker_error(e)
+
+
 # ----------------------------
 # Main
 # ----------------------------
@@ -207,74 +294,45 @@ def main() -> None:
     if SMOKE_N is not None:
         stock_files = stock_files[: int(SMOKE_N)]
 
-    print(f"[RUN] stocks_total={len(stock_files)} done={len(done)} remaining={len([p for p in stock_files if p.stem not in done])}")
+    remaining = [p for p in stock_files if p.stem not in done]
+    print(f"[RUN] stocks_total={len(stock_files)} done={len(done)} remaining={len(remaining)}")
 
     ok_n = 0
     err_n = 0
 
-    for p in stock_files:
-        ticker = p.stem  # assumes file name is TICKER.parquet
-        if ticker in done:
-            continue
-
-        t0 = datetime.now(timezone.utc)
-        try:
-            stock = read_stock_parquet(p)
-
-            # Map sector/spider_id
-            meta = uni_map.get(ticker)
-            if not meta:
-                raise KeyError(f"{ticker}: not found in universe CSV (ticker column).")
-            sector = meta["sector"]
-            spider_id = meta["spider_id"]
-
-            # Subset spider stages for this sector to speed up merge
-            sp = spiders.loc[spiders["spider_id"] == spider_id].copy()
-            if sp.empty:
-                raise KeyError(f"{ticker}: spider stages not found for spider_id={spider_id}")
-
-            # Merge on date
-            merged = stock.merge(sp, on="date", how="left")
-
-            # Attach sector metadata
-            merged["sector"] = sector
-            merged["spider_id"] = spider_id
-
-            # Sanity: if all sector_stage are null, date alignment is broken
-            if merged["sector_stage"].isna().all():
-                raise RuntimeError(
-                    f"{ticker}: merge produced all-NaN sector_stage. "
-                    f"Check date alignment + timezone + spider stages date range for {spider_id}."
-                )
-
-            out_path = OUT_DIR / f"{ticker}.parquet"
-            merged.to_parquet(out_path, index=False)
-
-            append_jsonl(PROGRESS_JSONL, {
-                "ts": utc_now(),
-                "ticker": ticker,
-                "status": "ok",
-                "sector": sector,
-                "spider_id": spider_id,
-                "rows": int(len(merged)),
-                "out": str(out_path),
-                "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
-            })
-
-            ok_n += 1
-            if ok_n % 100 == 0:
-                print(f"[OK] processed={ok_n} last={ticker}")
-
-        except Exception as e:
-            append_jsonl(ERRORS_JSONL, {
-                "ts": utc_now(),
-                "ticker": ticker,
-                "status": "error",
-                "error": repr(e),
-                "file": str(p),
-            })
-            print(f"[ERROR] {ticker}: {e}")
-            err_n += 1
+    # Split once per spider, indexed by date so each stock is a hash join
+    stages_by_spider = {
+        sid: g.set_index("date").sort_index()
+        for sid, g in spiders.groupby("spider_id", sort=False)
+    }
+
+    # Stocks are independent; workers only merge + write parquets and the
+    # JSONL logs are appended here, in file order.
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    with progress_log, errors_log, ordered_map(
+        attach_one, remaining, workers=N_WORKERS,
+        initializer=_init_worker, initargs=(uni_map, stages_by_spider), chunksize=8,
+    ) as results:
+        for p, (rec, err) in zip(remaining, results):
+            ticker = p.stem
+            if err is None:
+                progress_log.write({"ts": utc_now(), **rec})
+
+                ok_n += 1
+                if ok_n % 100 == 0:
+                    print(f"[OK] processed={ok_n} last={ticker}")
+
+            else:
+                errors_log.write({
+                    "ts": utc_now(),
+                    "ticker": ticker,
+                    "status": "error",
+                    "error": err[0],
+                    "file": str(p),
+                })
+                print(f"[ERROR] {ticker}: {err[1]}")
+                err_n += 1
 
     print(f"\n[SUMMARY] ok={ok_n} error={err_n}")
     if ok_n == 0 and err_n > 0:
@@ -16,8 +16,7 @@ if str(ROOT) not in sys.path:
 from filters.spider_gate import (
     SpiderStageStore,
     load_spider_gate_config,
-    spider_gate_decision,
-    spider_risk_multiplier,
+    spider_gate_table,
 )
 
 OUT_DIR = ROOT / "data" / "cleaned" / "spiders_daily" / "gate"
@@ -49,25 +48,18 @@ def main() -> None:
     if stages_df.empty:
         raise SystemExit("No spider stages loaded.")
 
-    # Build decision row-by-row (only ~10 spiders * ~1000 days => tiny)
-    rows = []
-    for r in stages_df.itertuples(index=False):
-        spider_id = str(r.spider_id)
-        date = pd.to_datetime(r.date).normalize()
-        stage = int(r.stage)
-
-        d = spider_gate_decision(store, spider_id, date, cfg)
-        rows.append({
-            "date": date,
-            "spider_id": spider_id,
-            "sector_stage": stage,
-            "sector_stage_name": r.stage_name,
-            "allowed": bool(d["allowed"]),
-            "reason": d.get("reason"),
-            "risk_mult": float(spider_risk_multiplier(stage, cfg)),
-        })
-
-    out = pd.DataFrame(rows).sort_values(["date", "spider_id"]).reset_index(drop=True)
+    # Gate decision for every (spider_id, date) row in one vectorized pass
+    gate = spider_gate_table(stages_df, cfg)
+    out = pd.DataFrame({
+        "date": gate["date"],
+        "spider_id": gate["spider_id"].astype(str),
+        "sector_stage": gate["stage"],
+        "sector_stage_name": gate["stage_name"],
+        "allowed": gate["allowed"],
+        "reason": gate["reason"],
+        "risk_mult": gate["risk_mult"],
+    })
+    out = out.sort_values(["date", "spider_id"]).reset_index(drop=True)
     out.to_parquet(OUT_PARQUET, index=False)
 
     append_jsonl(PROGRESS_JSONL, {
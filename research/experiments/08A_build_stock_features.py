@@ -31,14 +31,18 @@ Logs:
 from __future__ import annotations
 
 import json
+import multiprocessing
+import os
 import sys
 from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from types import SimpleNamespace
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 
 # -----------------------------------------------------------------------------
@@ -48,6 +52,8 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from research.pipeline_io import JsonlWriter, ordered_map, worker_error
+
 RAW_DIR = ROOT / "data" / "raw" / "prices_daily" / "twelvedata" / "parquets"
 OUT_DIR = ROOT / "data" / "cleaned" / "stocks_daily" / "features"
 PROGRESS_JSONL = OUT_DIR / "_progress.jsonl"
@@ -61,12 +67,19 @@ INDICATORS_YAML = ROOT / "config" / "indicators.yaml"
 SMOKE_N: Optional[int] = None   # e.g. 5 or None for all
 SMOKE_TICKERS: Optional[str] = None  # e.g. "AAPL,MSFT" or None for all
 
+# Tickers processed concurrently in worker processes (1 = sequential)
+N_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
 # -----------------------------------------------------------------------------
 # Imports from your canonical pipeline
 # -----------------------------------------------------------------------------
 from features.technicals.pipeline import apply_indicators  # noqa: E402
 
 
+# Config loaded once in main() and handed to each worker by _init_worker
+_CFG: Optional[SimpleNamespace] = None
+
+
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
@@ -74,12 +87,6 @@ def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def append_jsonl(path: Path, obj: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-
-
 def load_done_set(progress_path: Path) -> set[str]:
     done = set()
     if not progress_path.exists():
@@ -189,6 +196,19 @@ def read_ohlcv(path: Path) -> pd.DataFrame:
     raise KeyError(f"{path.name}: needs 'date' column or DatetimeIndex")
 
 
+def write_features_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Features -> zstd parquet. Columns are floats, so no dictionary pages."""
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=False,
+        write_statistics=True,
+    )
+
+
 def validate_ohlcv_cols(df: pd.DataFrame, path: Path) -> None:
     needed = {"open", "high", "low", "close", "volume"}
     missing = needed - set(df.columns)
@@ -196,6 +216,55 @@ def validate_ohlcv_cols(df: pd.DataFrame, path: Path) -> None:
         raise KeyError(f"{path.name} missing OHLCV columns: {sorted(missing)}")
 
 
+def _init_worker(cfg: SimpleNamespace) -> None:
+    global _CFG
+    _CFG = cfg
+    if multiprocessing.parent_process() is not None:
+        # N_WORKERS processes already use the cores; keep numba prange to one thread each
+        try:
+            import numba
+        except ImportError:
+            return
+        numba.set_num_threads(1)
+
+
+def build_one(p: Path) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Compute + write features for one ticker (runs in a worker process).
+
+    Returns (progress record, error); error comes from worker_error.
+    """
+    ticker = p.stem
+    t0 = datetime.now(timezone.utc)
+    try:
+        df = read_ohlcv(p)
+        validate_ohlcv_cols(df, p)
+
+        # Compute indicators
+        feat = apply_indicators(df, _CFG)
+
+        # Basic sanity
+        if "date" not in feat.columns:
+            raise RuntimeError(f"{ticker}: features output missing 'date' column")
+        feat = feat.sort_values("date").reset_index(drop=True)
+
+        out_path = OUT_DIR / f"{ticker}.parquet"
+        write_features_parquet(feat, out_path)
+
+        return {
+            "status": "ok",
+            "ticker": ticker,
+            "rows": int(len(feat)),
+            "first_date": str(pd.to_datetime(feat["date"].iloc[0]).date()),
+            "last_date": str(pd.to_datetime(feat["date"].iloc[-1]).date()),
+            "out": str(out_path),
+            "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
+        }, None
+
+    except Exception as e:
+        return None, worker_error(e)
+
+
 # -----------------------------------------------------------------------------
 # Main
 # -----------------------------------------------------------------------------
@@ -229,52 +298,33 @@ def main() -> None:
     ok_n = 0
     err_n = 0
 
-    for p in files:
-        ticker = p.stem
-        if ticker in done:
-            continue
-
-        t0 = datetime.now(timezone.utc)
-        try:
-            df = read_ohlcv(p)
-            validate_ohlcv_cols(df, p)
-
-            # Compute indicators
-            feat = apply_indicators(df, cfg)
-
-            # Basic sanity
-            if "date" not in feat.columns:
-                raise RuntimeError(f"{ticker}: features output missing 'date' column")
-            feat = feat.sort_values("date").reset_index(drop=True)
-
-            out_path = OUT_DIR / f"{ticker}.parquet"
-            feat.to_parquet(out_path, index=False)
-
-            append_jsonl(PROGRESS_JSONL, {
-                "ts": utc_now(),
-                "status": "ok",
-                "ticker": ticker,
-                "rows": int(len(feat)),
-                "first_date": str(pd.to_datetime(feat["date"].iloc[0]).date()),
-                "last_date": str(pd.to_datetime(feat["date"].iloc[-1]).date()),
-                "out": str(out_path),
-                "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
-            })
-
-            ok_n += 1
-            if ok_n % 100 == 0:
-                print(f"[OK] processed={ok_n} last={ticker}")
-
-        except Exception as e:
-            append_jsonl(ERRORS_JSONL, {
-                "ts": utc_now(),
-                "status": "error",
-                "ticker": ticker,
-                "file": str(p),
-                "error": repr(e),
-            })
-            print(f"[ERROR] {ticker}: {e}")
-            err_n += 1
+    # Tickers are independent; workers only compute + write parquets and the
+    # JSONL logs are appended here, in file order.
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    with progress_log, errors_log, ordered_map(
+        build_one, remaining, workers=N_WORKERS,
+        initializer=_init_worker, initargs=(cfg,), chunksize=8,
+    ) as results:
+        for p, (rec, err) in zip(remaining, results):
+            ticker = p.stem
+            if err is None:
+                progress_log.write({"ts": utc_now(), **rec})
+
+                ok_n += 1
+                if ok_n % 100 == 0:
+                    print(f"[OK] processed={ok_n} last={ticker}")
+
+            else:
+                errors_log.write({
+                    "ts": utc_now(),
+                    "status": "error",
+                    "ticker": ticker,
+                    "file": str(p),
+                    "error": err[0],
+                })
+                print(f"[ERROR] {ticker}: {err[1]}")
+                err_n += 1
 
     print(f"\n[SUMMARY] ok={ok_n} error={err_n}")
     if ok_n == 0 and err_n > 0:
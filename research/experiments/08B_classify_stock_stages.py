@@ -30,12 +30,15 @@ Logs:
 from __future__ import annotations
 
 import json
+import os
 import sys
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import yaml
 
 # -----------------------------------------------------------------------------
@@ -45,6 +48,8 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from research.pipeline_io import JsonlWriter, ordered_map, worker_error
+
 IN_DIR = ROOT / "data" / "cleaned" / "stocks_daily" / "features"
 OUT_DIR = ROOT / "data" / "cleaned" / "stocks_daily" / "stages"
 PROGRESS_JSONL = OUT_DIR / "_progress.jsonl"
@@ -58,12 +63,19 @@ STAGES_YAML = ROOT / "config" / "stages.yaml"
 SMOKE_N: Optional[int] = None        # e.g. 5 or None for all
 SMOKE_TICKERS: Optional[str] = None  # e.g. "AAPL,MSFT,NVDA" or None for all
 
+# Tickers processed concurrently in worker processes (1 = sequential)
+N_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
 # -----------------------------------------------------------------------------
 # Canonical classifier
 # -----------------------------------------------------------------------------
 from stages.stage_classifier import classify_stages  # noqa: E402
 
 
+# Config loaded once in main() and handed to each worker by _init_worker
+_CFG: Optional[dict] = None
+
+
 # -----------------------------------------------------------------------------
 # Helpers
 # -----------------------------------------------------------------------------
@@ -71,12 +83,6 @@ def utc_now() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def append_jsonl(path: Path, obj: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(obj, ensure_ascii=False) + "\n")
-
-
 def load_yaml(path: Path) -> dict:
     if not path.exists():
         raise FileNotFoundError(f"Missing YAML: {path}")
@@ -127,6 +133,23 @@ def read_features(path: Path) -> pd.DataFrame:
     raise KeyError(f"{path.name}: needs 'date' column or DatetimeIndex")
 
 
+# Low-cardinality classifier outputs; the feature columns are near-unique floats
+STAGE_DICT_COLS = ["stage", "stage_name", "stage_reason", "stage_flags"]
+
+
+def write_stages_parquet(df: pd.DataFrame, path: Path) -> None:
+    """Stock stages -> zstd parquet, same settings as the 07D spider stages."""
+    tbl = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        tbl,
+        path,
+        compression="zstd",
+        compression_level=3,
+        use_dictionary=[c for c in STAGE_DICT_COLS if c in df.columns],
+        write_statistics=True,
+    )
+
+
 def sanity_check_min_cols(df: pd.DataFrame, ticker: str) -> None:
     # classifier typically needs close/high/low/volume + key EMAs / Donchian / BB
     required = {"date", "close", "high", "low", "volume", "ema200"}
@@ -135,6 +158,58 @@ def sanity_check_min_cols(df: pd.DataFrame, ticker: str) -> None:
         raise KeyError(f"{ticker}: features missing required columns: {sorted(missing)}")
 
 
+def _init_worker(cfg: dict) -> None:
+    global _CFG
+    _CFG = cfg
+
+
+def classify_one(p: Path) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, str]]]:
+    """
+    Classify + write stages for one ticker (runs in a worker process).
+
+    Returns (progress record, error); error comes from worker_error.
+    """
+    ticker = p.stem
+    t0 = datetime.now(timezone.utc)
+    try:
+        df = read_features(p)
+        sanity_check_min_cols(df, ticker)
+
+        out = classify_stages(df=df, cfg=_CFG)
+
+        # Ensure expected outputs exist
+        if "stage" not in out.columns:
+            raise RuntimeError(f"{ticker}: classifier output missing 'stage'")
+        if "stage_name" not in out.columns:
+            # allow older classifier versions, but keep it explicit
+            out["stage_name"] = None
+        if "stage_reason" not in out.columns:
+            out["stage_reason"] = None
+
+        out = out.sort_values("date").reset_index(drop=True)
+
+        out_path = OUT_DIR / f"{ticker}.parquet"
+        write_stages_parquet(out, out_path)
+
+        # Quick metrics for audit
+        stage_counts = out["stage"].value_counts().sort_index()
+        stages_present = sorted(int(x) for x in stage_counts.index.tolist())
+
+        return {
+            "status": "ok",
+            "ticker": ticker,
+            "rows": int(len(out)),
+            "first_date": str(pd.to_datetime(out["date"].iloc[0]).date()),
+            "last_date": str(pd.to_datetime(out["date"].iloc[-1]).date()),
+            "stages_present": stages_present,
+            "out": str(out_path),
+            "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
+        }, None
+
+    except Exception as e:
+        return None, worker_error(e)
+
+
 # -----------------------------------------------------------------------------
 # Main
 # -----------------------------------------------------------------------------
@@ -166,62 +241,33 @@ def main() -> None:
     ok_n = 0
     err_n = 0
 
-    for p in files:
-        ticker = p.stem
-        if ticker in done:
-            continue
-
-        t0 = datetime.now(timezone.utc)
-        try:
-            df = read_features(p)
-            sanity_check_min_cols(df, ticker)
-
-            out = classify_stages(df=df, cfg=cfg)
-
-            # Ensure expected outputs exist
-            if "stage" not in out.columns:
-                raise RuntimeError(f"{ticker}: classifier output missing 'stage'")
-            if "stage_name" not in out.columns:
-                # allow older classifier versions, but keep it explicit
-                out["stage_name"] = None
-            if "stage_reason" not in out.columns:
-                out["stage_reason"] = None
-
-            out = out.sort_values("date").reset_index(drop=True)
-
-            out_path = OUT_DIR / f"{ticker}.parquet"
-            out.to_parquet(out_path, index=False)
-
-            # Quick metrics for audit
-            stage_counts = out["stage"].value_counts().sort_index()
-            stages_present = sorted(int(x) for x in stage_counts.index.tolist())
-
-            append_jsonl(PROGRESS_JSONL, {
-                "ts": utc_now(),
-                "status": "ok",
-                "ticker": ticker,
-                "rows": int(len(out)),
-                "first_date": str(pd.to_datetime(out["date"].iloc[0]).date()),
-                "last_date": str(pd.to_datetime(out["date"].iloc[-1]).date()),
-                "stages_present": stages_present,
-                "out": str(out_path),
-                "elapsed_s": round((datetime.now(timezone.utc) - t0).total_seconds(), 3),
-            })
-
-            ok_n += 1
-            if ok_n % 100 == 0:
-                print(f"[OK] processed={ok_n} last={ticker}")
-
-        except Exception as e:
-            append_jsonl(ERRORS_JSONL, {
-                "ts": utc_now(),
-                "status": "error",
-                "ticker": ticker,
-                "file": str(p),
-                "error": repr(e),
-            })
-            print(f"[ERROR] {ticker}: {e}")
-            err_n += 1
+    # Tickers are independent; workers only classify + write parquets and the
+    # JSONL logs are appended here, in file order.
+    progress_log = JsonlWriter(PROGRESS_JSONL)
+    errors_log = JsonlWriter(ERRORS_JSONL)
+    with progress_log, errors_log, ordered_map(
+        classify_one, remaining, workers=N_WORKERS,
+        initializer=_init_worker, initargs=(cfg,), chunksize=8,
+    ) as results:
+        for p, (rec, err) in zip(remaining, results):
+            ticker = p.stem
+            if err is None:
+                progress_log.write({"ts": utc_now(), **rec})
+
+                ok_n += 1
+                if ok_n % 100 == 0:
+                    print(f"[OK] processed={ok_n} last={ticker}")
+
+            else:
+                errors_log.write({
+                    "ts": utc_now(),
+                    "status": "error",
+                    "ticker": ticker,
+                    "file": str(p),
+                    "error": err[0],
+                })
+                print(f"[ERROR] {ticker}: {err[1]}")
+                err_n += 1
 
     print(f"\n[SUMMARY] ok={ok_n} error={err_n}")
     if ok_n == 0 and err_n > 0:
@@ -0,0 +1,147 @@
+# research/pipeline_io.py
+"""
+I/O helpers shared by the research/experiments pipeline scripts.
+"""
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple, Type
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+
+def dumps_json(obj, indent: bool = False) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+
+def loads_json(s):
+    return orjson.loads(s) if orjson is not None else json.loads(s)
+
+
+def latest_file(directory: Path, pattern: str) -> Optional[Path]:
+    """
+    Newest file in `directory` whose name matches the glob `pattern` (equal
+    mtimes go to the lower name), or None. One scandir pass, no name sort.
+    """
+    best, best_key = None, None
+    if directory.is_dir():
+        with os.scandir(directory) as it:
+            for e in it:
+                if fnmatch.fnmatchcase(e.name, pattern) and e.is_file():
+                    key = (-e.stat().st_mtime, e.name)  # DirEntry.stat() is cached
+                    if best_key is None or key < best_key:
+                        best, best_key = e.path, key
+    return Path(best) if best is not None else None
+
+
+def parquet_date_stats(fp: Path) -> Tuple[int, Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """
+    (non-null date rows, first date, last date) for a parquet with a `date` column.
+
+    Timestamp columns are answered from the footer's row-group statistics
+    without reading any data; anything else falls back to parsing the column.
+    """
+    pf = pq.ParquetFile(fp)
+    md = pf.metadata
+    j = pf.schema_arrow.get_field_index("date")
+    if j < 0:
+        raise KeyError(f"no 'date' column in {fp.name}")
+
+    if pa.types.is_timestamp(pf.schema_arrow.field(j).type):
+        stats = [md.row_group(i).column(j).statistics for i in range(md.num_row_groups)]
+        if all(st is not None and (st.has_min_max or st.num_values == 0) for st in stats):
+            with_vals = [st for st in stats if st is not None and st.num_values]
+            n = sum(st.num_values for st in with_vals)
+            if n == 0:
+                return 0, None, None
+            return (
+                int(n),
+                pd.Timestamp(min(st.min for st in with_vals)),
+                pd.Timestamp(max(st.max for st in with_vals)),
+            )
+
+    dates = pd.to_datetime(pf.read(columns=["date"]).column(0).to_pandas(), errors="coerce").dropna()
+    if dates.empty:
+        return 0, None, None
+    return int(len(dates)), dates.min(), dates.max()
+
+
+class JsonlWriter:
+    """
+    Append-only JSONL log kept open for the whole run (opened on first write),
+    flushed every `flush_every` records and on close.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 50):
+        self.path = path
+        self.flush_every = flush_every
+        self._f = None
+        self._n = 0
+
+    def write(self, obj: Dict[str, Any]) -> None:
+        if self._f is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._f = self.path.open("a", encoding="utf-8", buffering=1 << 16)
+        self._f.write(dumps_json(obj) + "\n")
+        self._n += 1
+        if self._n % self.flush_every == 0:
+            self._f.flush()
+
+    def close(self) -> None:
+        if self._f is not None and not self._f.closed:
+            self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def worker_error(e: BaseException) -> Tuple[str, str]:
+    """(repr, str) of a worker's exception; plain strings pickle back whatever its type."""
+    return repr(e), str(e)
+
+
+@contextmanager
+def ordered_map(
+    fn: Callable,
+    items: Sequence,
+    *,
+    workers: int,
+    executor: Type[Executor] = ProcessPoolExecutor,
+    initializer: Optional[Callable] = None,
+    initargs: tuple = (),
+    chunksize: int = 1,
+) -> Iterator[Iterator]:
+    """
+    Yields fn(item) for every item, in item order.
+
+    Runs on `executor` when there is more than one worker and item, otherwise
+    in-process (initializer is then called here first). On exit, however it
+    happens, work not yet started is cancelled and the pool shut down.
+    """
+    if workers > 1 and len(items) > 1:
+        pool = executor(max_workers=min(workers, len(items)), initializer=initializer, initargs=initargs)
+        try:
+            yield pool.map(fn, items, chunksize=chunksize)
+        finally:
+            pool.shutdown(cancel_futures=True)
+    else:
+        if initializer is not None:
+            initializer(*initargs)
+        yield map(fn, items)
@@ -2,9 +2,10 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
 from features.technicals.ema import compute_ema
@@ -95,26 +96,13 @@ def _normalize_indicators_cfg(ind_yaml: dict) -> dict:
     return out
 
 
-def classify_stage(df: pd.DataFrame, cfg_ind: Dict, cfg_stages: Dict) -> StageResult:
+def _stage_inputs(df: pd.DataFrame, cfg_ind: Dict) -> Dict[str, np.ndarray]:
     """
-    Minimal v1 stage classifier.
-    - Deterministic
-    - Long-only compatible
-    - Designed to run end-to-end for smoke testing
+    Full-length float64 arrays of everything the stage rules read.
 
-    Expected df columns: time, open, high, low, close, volume (OHLCV)
-    Uses the *latest* row (most recent bar).
-
-    NOTE: This rule set is intentionally conservative and will be refined.
+    Every indicator here is causal (EMA recursion, trailing rolling windows),
+    so value [i] equals what the same indicator gives on df.iloc[: i + 1].
     """
-    if df is None or df.empty:
-        return StageResult(1, STAGE_NAMES[1], ["empty_df"])
-
-    required = {"high", "low", "close", "volume"}
-    missing = required - set(df.columns)
-    if missing:
-        return StageResult(1, STAGE_NAMES[1], [f"missing_cols={sorted(missing)}"])
-
     lb = cfg_ind["lookbacks"]
     close = df["close"]
     high = df["high"]
@@ -131,30 +119,50 @@ def classify_stage(df: pd.DataFrame, cfg_ind: Dict, cfg_stages: Dict) -> StageRe
     bb = compute_bollinger(close, lb["bollinger_period"], cfg_ind["bollinger"]["stdev"])
     relvol = compute_relative_volume(vol, lb["vol_avg_period"])
 
-    # Latest values
-    i = df.index[-1]
-    c = float(close.loc[i])
-    e10 = float(ema10.loc[i]) if pd.notna(ema10.loc[i]) else None
-    e20 = float(ema20.loc[i]) if pd.notna(ema20.loc[i]) else None
-    e50 = float(ema50.loc[i]) if pd.notna(ema50.loc[i]) else None
-    e200 = float(ema200.loc[i]) if pd.notna(ema200.loc[i]) else None
+    return {
+        "close": close.to_numpy(dtype=np.float64),
+        "ema10": ema10.to_numpy(dtype=np.float64),
+        "ema20": ema20.to_numpy(dtype=np.float64),
+        "ema50": ema50.to_numpy(dtype=np.float64),
+        "ema200": ema200.to_numpy(dtype=np.float64),
+        # prior bar's channel
+        "d_high": don["donchian_high"].shift(1).to_numpy(dtype=np.float64),
+        "d_low": don["donchian_low"].shift(1).to_numpy(dtype=np.float64),
+        "bb_mid": bb["bb_mid"].to_numpy(dtype=np.float64),
+        "bb_lower": bb["bb_lower"].to_numpy(dtype=np.float64),
+        "bb_upper": bb["bb_upper"].to_numpy(dtype=np.float64),
+        "rv": relvol.to_numpy(dtype=np.float64),
+    }
 
-    don_high_s = don["donchian_high"].shift(1)
-    don_low_s = don["donchian_low"].shift(1)
 
-    d_high = float(don_high_s.loc[i]) if pd.notna(don_high_s.loc[i]) else None
-    d_low = float(don_low_s.loc[i]) if pd.notna(don_low_s.loc[i]) else None
+def _opt(v: float) -> Optional[float]:
+    return None if np.isnan(v) else float(v)
+
+
+def _classify_at(x: Dict[str, np.ndarray], i: int, cfg_ind: Dict) -> StageResult:
+    """Stage rules for bar i, seeing only the first i + 1 bars."""
+    lb = cfg_ind["lookbacks"]
+
+    # Latest values
+    c = float(x["close"][i])
+    e10 = _opt(x["ema10"][i])
+    e20 = _opt(x["ema20"][i])
+    e50 = _opt(x["ema50"][i])
+    e200 = _opt(x["ema200"][i])
+
+    d_high = _opt(x["d_high"][i])
+    d_low = _opt(x["d_low"][i])
 
-    bb_mid = float(bb["bb_mid"].loc[i]) if pd.notna(bb["bb_mid"].loc[i]) else None
-    bb_lower = float(bb["bb_lower"].loc[i]) if pd.notna(bb["bb_lower"].loc[i]) else None
-    bb_upper = float(bb["bb_upper"].loc[i]) if pd.notna(bb["bb_upper"].loc[i]) else None
+    bb_mid = _opt(x["bb_mid"][i])
+    bb_lower = _opt(x["bb_lower"][i])
+    bb_upper = _opt(x["bb_upper"][i])
 
-    rv = float(relvol.loc[i]) if pd.notna(relvol.loc[i]) else None
+    rv = _opt(x["rv"][i])
 
     # Not enough history → Not Eligible
     min_hist = int(lb["min_history_days"])
-    if len(df) < min_hist:
-        return StageResult(1, STAGE_NAMES[1], [f"insufficient_history={len(df)}<{min_hist}"])
+    if i + 1 < min_hist:
+        return StageResult(1, STAGE_NAMES[1], [f"insufficient_history={i + 1}<{min_hist}"])
 
     reasons: List[str] = []
 
@@ -227,6 +235,30 @@ def classify_stage(df: pd.DataFrame, cfg_ind: Dict, cfg_stages: Dict) -> StageRe
     return StageResult(1, STAGE_NAMES[1], ["no_rule_matched"])
 
 
+def classify_stage(df: pd.DataFrame, cfg_ind: Dict, cfg_stages: Dict) -> StageResult:
+    """
+    Minimal v1 stage classifier.
+    - Deterministic
+    - Long-only compatible
+    - Designed to run end-to-end for smoke testing
+
+    Expected df columns: time, open, high, low, close, volume (OHLCV)
+    Uses the *latest* row (most recent bar).
+
+    NOTE: This rule set is intentionally conservative and will be refined.
+    """
+    if df is None or df.empty:
+        return StageResult(1, STAGE_NAMES[1], ["empty_df"])
+
+    required = {"high", "low", "close", "volume"}
+    missing = required - set(df.columns)
+    if missing:
+        return StageResult(1, STAGE_NAMES[1], [f"missing_cols={sorted(missing)}"])
+
+    x = _stage_inputs(df, cfg_ind)
+    return _classify_at(x, len(df) - 1, cfg_ind)
+
+
 def run_stage_classifier(*, df: pd.DataFrame, cfg: Dict) -> pd.DataFrame:
     """
     Produce a DAILY stage label series for an OHLCV dataframe.
@@ -236,7 +268,7 @@ def run_stage_classifier(*, df: pd.DataFrame, cfg: Dict) -> pd.DataFrame:
 
     Notes:
     - Uses an expanding window up to each date (point-in-time safe).
-    - Calls classify_stage() on each day using data available up to that day.
+    - Applies the classify_stage() rules on each day using data available up to that day.
     - Works for BOTH stocks and spiders.
     """
     if df is None or df.empty:
@@ -284,11 +316,17 @@ def run_stage_classifier(*, df: pd.DataFrame, cfg: Dict) -> pd.DataFrame:
     dates = work.index
     out_rows = []
 
+    # Indicators are causal, so computing them once over the full history and
+    # reading bar i gives the same values as classify_stage(work.iloc[: i + 1]).
+    missing = {"high", "low", "close", "volume"} - set(work.columns)
+    x = None if missing else _stage_inputs(work, cfg_ind)
+
     # Expanding window classification
     for i, dt in enumerate(dates):
-        slice_df = work.iloc[: i + 1].copy()
-
-        r = classify_stage(slice_df, cfg_ind, cfg_stages)
+        if x is None:
+            r = StageResult(1, STAGE_NAMES[1], [f"missing_cols={sorted(missing)}"])
+        else:
+            r = _classify_at(x, i, cfg_ind)
 
         # Update memory (breakout started)
         if int(r.stage_id) in (6, 7):
@@ -0,0 +1,110 @@
+# Path: tests/test_06_fetch_batch_json.py
+"""
+06's batch split against the real twelvedata client.
+
+Only the HTTP layer is faked (requests.Session.get returns API-shaped JSON),
+so fetch_batch sees exactly what the installed client hands back.
+"""
+from __future__ import annotations
+
+import importlib.util
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import requests
+
+pytest.importorskip("twelvedata")
+pytest.importorskip("dotenv")
+
+ROOT = Path(__file__).resolve().parents[1]
+SCRIPT = ROOT / "research" / "experiments" / "06_fetch_twelvedata_ohlcv_3y.py"
+
+
+def _load_06():
+    spec = importlib.util.spec_from_file_location("fetch_06", SCRIPT)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _candles(n: int):
+    days = pd.bdate_range("2024-01-02", periods=n)
+    # whole-number prices + integer volumes: the shapes that parse to int64
+    return [
+        {"datetime": d.strftime("%Y-%m-%d"), "open": str(100 + i), "high": str(101 + i),
+         "low": str(99 + i), "close": str(100 + i), "volume": str(1000 * (i + 1))}
+        for i, d in enumerate(days)
+    ]
+
+
+def _meta(sym: str):
+    return {"symbol": sym, "interval": "1day", "currency": "USD", "type": "Common Stock"}
+
+
+@pytest.fixture
+def fake_http(monkeypatch):
+    payloads = {}
+
+    def get(self, url, *args, **kwargs):
+        params = kwargs.get("params", {})
+        if url.endswith("/technical_indicators"):
+            # client start-up: indicator metadata, none needed here
+            body = {"data": {}, "status": "ok"}
+        else:
+            body = payloads[params["symbol"]]
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp._content = json.dumps(body).encode("utf-8")
+        return resp
+
+    monkeypatch.setattr(requests.Session, "get", get)
+    return payloads
+
+
+@pytest.fixture
+def m06():
+    return _load_06()
+
+
+def _fetch(m06, batch):
+    td = m06.TDClient(apikey="test")
+    bucket = m06.CreditBucket(credits_per_min=10_000, capacity=len(batch))
+    return m06.fetch_batch(td, bucket, 1, 1, batch)
+
+
+def test_batch_splits_ok_and_error_symbols(m06, fake_http):
+    fake_http["AAA,BAD,CCC"] = {
+        "AAA": {"meta": _meta("AAA"), "values": _candles(5), "status": "ok"},
+        "BAD": {"code": 404, "message": "**symbol** BAD not found", "status": "error"},
+        "CCC": {"meta": _meta("CCC"), "values": _candles(3), "status": "ok"},
+    }
+    parts = _fetch(m06, ["AAA", "BAD", "CCC"])
+
+    assert set(parts) == {"AAA", "BAD", "CCC"}
+    assert isinstance(parts["BAD"], RuntimeError)
+    assert "not found" in str(parts["BAD"])
+    assert len(parts["AAA"]) == 5 and len(parts["CCC"]) == 3
+
+
+def test_single_symbol_batch(m06, fake_http):
+    fake_http["AAA"] = {"meta": _meta("AAA"), "values": _candles(4), "status": "ok"}
+    parts = _fetch(m06, ["AAA"])
+
+    assert list(parts) == ["AAA"]
+    assert len(parts["AAA"]) == 4
+
+
+def test_normalized_ohlcv_is_float64(m06, fake_http):
+    fake_http["AAA,CCC"] = {
+        "AAA": {"meta": _meta("AAA"), "values": _candles(5), "status": "ok"},
+        "CCC": {"meta": _meta("CCC"), "values": _candles(2), "status": "ok"},
+    }
+    out = m06.normalize_ohlcv(_fetch(m06, ["AAA", "CCC"])["AAA"])
+
+    assert str(out["date"].dtype).startswith("datetime64")
+    for c in m06.OHLCV_COLS:
+        assert out[c].dtype == "float64", c
+    assert out["volume"].tolist() == [1000.0, 2000.0, 3000.0, 4000.0, 5000.0]
@@ -0,0 +1,56 @@
+# Path: tests/test_pipeline_io.py
+"""
+research.pipeline_io: the JSONL log and ordered pool shared by the 06-08 scripts.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from research.pipeline_io import JsonlWriter, loads_json, ordered_map, worker_error
+
+_SEEN = []
+
+
+def _init(tag):
+    _SEEN.append(tag)
+
+
+def _square(x):
+    return x * x
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_ordered_map_keeps_item_order(workers):
+    items = list(range(20))
+    with ordered_map(_square, items, workers=workers, executor=ThreadPoolExecutor) as results:
+        assert list(results) == [x * x for x in items]
+
+
+def test_ordered_map_runs_initializer_in_process():
+    _SEEN.clear()
+    with ordered_map(_square, [3], workers=4, initializer=_init, initargs=("seq",)) as results:
+        assert list(results) == [9]
+    assert _SEEN == ["seq"]
+
+
+def test_jsonl_writer_flushes_buffered_lines_on_error(tmp_path):
+    path = tmp_path / "logs" / "_progress.jsonl"
+    with pytest.raises(RuntimeError):
+        with JsonlWriter(path, flush_every=1000) as log:
+            log.write({"ticker": "AAA", "status": "ok"})
+            log.write({"ticker": "BÉB", "status": "ok"})
+            raise RuntimeError("worker died")
+
+    rows = [loads_json(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [r["ticker"] for r in rows] == ["AAA", "BÉB"]
+
+
+def test_worker_error_is_plain_strings():
+    class Odd(Exception):
+        pass
+
+    r, s = worker_error(Odd("boom"))
+    assert (type(r), type(s)) == (str, str)
+    assert "Odd" in r and s == "boom"